@@ -0,0 +1,39 @@
+"""Short-lived mutual exclusion across processes, held in the shared cache.
+
+A lock is a cache key added with ``cache.add`` (atomic on every backend)
+that holds a token unique to its holder. Release deletes the key only while
+it still holds that token, so a holder that ran past the timeout does not
+drop a lock another process has taken since. The check and the delete are
+two cache calls; the window between them is far shorter than any timeout.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+POLL_INTERVAL = 0.01  # seconds between attempts while waiting for a lock
+
+
+class LockUnavailable(Exception):
+    pass
+
+
+@contextmanager
+def cache_lock(key, timeout, wait=0):
+    """Hold ``key`` for at most ``timeout`` seconds.
+
+    Waits up to ``wait`` seconds for a current holder to release it, then
+    raises LockUnavailable.
+    """
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not cache.add(key, token, timeout):
+        if time.monotonic() >= deadline:
+            raise LockUnavailable(key)
+        time.sleep(POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        if cache.get(key) == token:
+            cache.delete(key)
@@ -0,0 +1,23 @@
+"""One-off django-q tasks that run at a given time.
+
+``async_task`` hands a task to the next free worker; django-q has no delay
+option for it. Work due later is stored as a ONCE Schedule instead, which
+the cluster's scheduler enqueues once ``next_run`` has passed (it checks
+about every 30 seconds) and then deletes. Schedule args are stored as their
+repr and read back with ``ast.literal_eval``, so pass ids and other
+literals, never model instances.
+"""
+from django.utils import timezone
+from django_q.models import Schedule
+from django_q.tasks import schedule
+
+
+def run_at(func, *args, at, name=None):
+    """Run ``func(*args)`` at ``at``, or as soon as possible if that has passed.
+
+    A pending schedule with the same ``name`` is replaced, so rescheduling
+    the same work moves it instead of running it twice.
+    """
+    if name:
+        Schedule.objects.filter(name=name).delete()
+    return schedule(func, *args, name=name, schedule_type=Schedule.ONCE, repeats=-1, next_run=max(at, timezone.now()))
@@ -61,6 +61,34 @@ Q_CLUSTER = {
     'orm': 'default',
 }
 
+# Optional single-writer bid sequencer: bids for an AuctionAsset are routed to
+# the process owning partition (auction_asset_id % PARTITIONS), which listens
+# on BASE_PORT + partition. Start the owners with `manage.py run_bid_sequencer`.
+BID_SEQUENCER = {
+    'ENABLED': os.getenv('BID_SEQUENCER_ENABLED') == 'True',
+    'HOST': os.getenv('BID_SEQUENCER_HOST', '127.0.0.1'),
+    'BASE_PORT': int(os.getenv('BID_SEQUENCER_BASE_PORT', '7600')),
+    'PARTITIONS': int(os.getenv('BID_SEQUENCER_PARTITIONS', '4')),
+    'AUTHKEY': os.getenv('BID_SEQUENCER_AUTHKEY', SECRET_KEY),
+    # Acknowledge bids with 202 and a sequence number as soon as they are
+    # ordered, before their batch is committed.
+    'ASYNC_ACK': os.getenv('BID_SEQUENCER_ASYNC_ACK') == 'True',
+    'BATCH_SIZE': 200,
+    'BATCH_WINDOW_MS': 5,
+    'TIMEOUT': 5,
+}
+
+# How /api/asset-media/<id>/content/ hands media bytes to the client: '' streams
+# them from Django, 'x-sendfile' (Apache/lighttpd) or 'x-accel-redirect' (nginx)
+# let the web server send them. ACCEL_PREFIX is the nginx `internal` location
+# aliased to MEDIA_ROOT.
+MEDIA_SENDFILE = {
+    'BACKEND': os.getenv('MEDIA_SENDFILE_BACKEND', ''),
+    'ACCEL_PREFIX': os.getenv('MEDIA_SENDFILE_ACCEL_PREFIX', '/protected-media/'),
+}
+
+# Maximum number of sub-requests accepted by the /api/batch/ endpoint.
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -75,7 +103,7 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
     'DEFAULT_PERMISSION_CLASSES': [
@@ -99,15 +127,29 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': False,
+    'TOKEN_REFRESH_SERIALIZER': 'users.authentication.ClaimsTokenRefreshSerializer',
+}
+
+# In-process cache of users without a "claims changed" marker, consulted by
+# ClaimsJWTAuthentication. Role or activity changes made in another process
+# take effect here after at most TTL seconds; the markers themselves live in
+# the shared cache, so run a shared CACHE_BACKEND with several workers.
+AUTH_CLAIMS_CACHE = {
+    'SIZE': 10000,
+    'TTL': 5,
 }
 
 # SMTP Mail service
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = "smtp.gmail.com"
+# Emails are queued in the outbox and delivered by django-q workers. Set
+# EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend, or point
+# EMAIL_HOST/EMAIL_PORT at a local SMTP server with EMAIL_USE_TLS=False, to
+# test without Gmail.
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', "smtp.gmail.com")
 EMAIL_HOST_USER = os.getenv('EMAIL_ACCOUNT')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_PASSWORD')
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '587'))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 ROOT_URLCONF = 'american_auction.urls'
@@ -149,6 +191,22 @@ if os.getenv('DB_ENGINE') == 'mssql':
         'DRIVER': 'ODBC Driver 17 for SQL Server',
     }
 
+# Cache
+# Defaults to an in-process cache; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# cache (e.g. django.core.cache.backends.redis.RedisCache) when running several
+# web or django-q worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+if CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': 100000,
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -4,6 +4,7 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from .views import batch
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -19,6 +20,7 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path('api/', include([
+        path('batch/', batch, name='batch'),
         path('', include('users.urls')),
         path('', include('auctions.urls')),
         path('', include('assets.urls')),
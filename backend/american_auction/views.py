@@ -0,0 +1,98 @@
+import json
+import logging
+from io import BytesIO
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+BATCH_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+
+logger = logging.getLogger(__name__)
+
+
+def _sub_request(request, method, path, body):
+    payload = json.dumps(body).encode() if body is not None else b''
+    url = urlparse(path)
+    # The batch's own headers (host, language, ...) apply to every sub-request.
+    environ = {key: value for key, value in request.META.items() if key.startswith('HTTP_')}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'SERVER_NAME': request.META.get('SERVER_NAME', 'localhost'),
+        'SERVER_PORT': request.META.get('SERVER_PORT', '443' if request.is_secure() else '80'),
+        'REMOTE_ADDR': request.META.get('REMOTE_ADDR', ''),
+        'wsgi.input': BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    # Share the batch's authentication instead of re-validating the token
+    # for every sub-request.
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def _dispatch(request, item):
+    if not isinstance(item, dict):
+        return {'status': status.HTTP_400_BAD_REQUEST, 'body': {"error": "Each request must be an object."}}
+    method = str(item.get('method', 'GET')).upper()
+    path = item.get('path') or ''
+    if method not in BATCH_METHODS:
+        return {'status': status.HTTP_405_METHOD_NOT_ALLOWED, 'body': {"error": f"Method {method} is not allowed."}}
+    if not path.startswith('/api/') or urlparse(path).path == request.path:
+        return {'status': status.HTTP_400_BAD_REQUEST, 'body': {"error": "Path must be an API endpoint other than the batch endpoint."}}
+    try:
+        match = resolve(urlparse(path).path)
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {"error": "Not found."}}
+
+    try:
+        response = match.func(_sub_request(request, method, path, item.get('body')), *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("Batch request %s %s failed", method, path)
+        return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {"error": "Internal server error."}}
+    return {'status': response.status_code, 'body': getattr(response, 'data', None)}
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def batch(request):
+    """Run an ordered list of API requests in-process and return every result.
+
+    Each request is ``{"method", "path", "body"}``. With ``"atomic": true``
+    they run in one transaction that is rolled back, and the batch stopped,
+    at the first response with an error status.
+    """
+    if not isinstance(request.data, dict):
+        return Response({"error": "The body must be an object."}, status=status.HTTP_400_BAD_REQUEST)
+    requests = request.data.get('requests')
+    if not isinstance(requests, list) or not requests:
+        return Response({"error": "requests must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(requests) > settings.BATCH_MAX_REQUESTS:
+        return Response({"error": f"A batch may contain at most {settings.BATCH_MAX_REQUESTS} requests."}, status=status.HTTP_400_BAD_REQUEST)
+
+    atomic = bool(request.data.get('atomic', False))
+    results = []
+    if atomic:
+        with transaction.atomic():
+            for item in requests:
+                results.append(_dispatch(request, item))
+                if results[-1]['status'] >= 400:
+                    transaction.set_rollback(True)
+                    break
+    else:
+        for item in requests:
+            results.append(_dispatch(request, item))
+
+    rolled_back = atomic and results[-1]['status'] >= 400
+    return Response({"atomic": atomic, "rolled_back": rolled_back, "results": results}, status=status.HTTP_200_OK)
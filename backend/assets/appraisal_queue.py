@@ -0,0 +1,158 @@
+"""The appraisal work queue.
+
+Assets registered for auction wait in the queue (``UNDER_APPRAISAL`` without
+an appraiser) until an appraiser with free capacity takes them. An asset is
+handed to the least loaded active appraiser, preferring the asset's category
+specialists and then whoever was assigned longest ago; an appraiser that
+finishes an appraisal pulls the oldest queued asset, from their specialty
+first. Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+database supports it, so concurrent registrations never share an appraiser
+slot or an asset, nor wait on each other.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Appraiser, Asset
+from .enums import AppraiserStatus, AssetAppraisalStatus, AssetStatus
+
+
+def _lock(queryset):
+    return queryset.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+
+
+def _queued():
+    return Asset.objects.filter(appraise_status=AssetAppraisalStatus.UNDER_APPRAISAL, appraiser__isnull=True)
+
+
+def _take(appraiser, count, now):
+    appraiser.active_assignments += count
+    appraiser.last_assigned_at = now
+    if appraiser.active_assignments >= appraiser.max_assignments:
+        appraiser.status = AppraiserStatus.INACTIVE
+    appraiser.save(update_fields=["active_assignments", "last_assigned_at", "status", "updated_at"])
+
+
+def enqueue(asset):
+    """Put ``asset`` in the queue; returns False if it is already queued or assigned."""
+    now = timezone.now()
+    queued = Asset.objects.filter(pk=asset.pk, appraiser__isnull=True).exclude(
+        appraise_status=AssetAppraisalStatus.UNDER_APPRAISAL,
+    ).update(appraise_status=AssetAppraisalStatus.UNDER_APPRAISAL, appraisal_queued_at=now, updated_at=now)
+    if queued:
+        asset.appraise_status = AssetAppraisalStatus.UNDER_APPRAISAL
+        asset.appraisal_queued_at = now
+    return bool(queued)
+
+
+def assign(asset):
+    """Hand a queued asset to the best available appraiser and return them, or None."""
+    with transaction.atomic():
+        appraiser = _lock(
+            Appraiser.objects.filter(status=AppraiserStatus.ACTIVE, active_assignments__lt=F("max_assignments"))
+        ).order_by(
+            Case(When(specialty=asset.category, then=Value(0)), default=Value(1), output_field=IntegerField()),
+            "active_assignments",
+            F("last_assigned_at").asc(nulls_first=True),
+            "pk",
+        ).first()
+        if appraiser is None:
+            return None
+        now = timezone.now()
+        if not _queued().filter(pk=asset.pk).update(appraiser=appraiser, updated_at=now):
+            return None
+        _take(appraiser, 1, now)
+    asset.appraiser = appraiser
+    return appraiser
+
+
+def claim(appraiser):
+    """Assign queued assets to ``appraiser`` up to their capacity; returns the assets claimed."""
+    with transaction.atomic():
+        appraiser = Appraiser.objects.select_for_update().get(pk=appraiser.pk)
+        free = appraiser.max_assignments - appraiser.active_assignments
+        claimed = []
+        if free <= 0:
+            return claimed
+        candidates = [_queued()]
+        if appraiser.specialty:
+            candidates.insert(0, _queued().filter(category=appraiser.specialty))
+        for queryset in candidates:
+            claimed += list(_lock(queryset.exclude(pk__in=[asset.pk for asset in claimed]))
+                            .order_by("appraisal_queued_at", "pk")[:free - len(claimed)])
+            if len(claimed) == free:
+                break
+        if claimed:
+            now = timezone.now()
+            Asset.objects.filter(pk__in=[asset.pk for asset in claimed]).update(appraiser=appraiser, updated_at=now)
+            for asset in claimed:
+                asset.appraiser = appraiser
+            _take(appraiser, len(claimed), now)
+    return claimed
+
+
+def release(appraiser_id, count=1):
+    """Free ``count`` finished assignments of an appraiser and refill them from the queue."""
+    Appraiser.objects.filter(pk=appraiser_id, active_assignments__gte=count).update(
+        active_assignments=F("active_assignments") - count,
+        status=AppraiserStatus.ACTIVE,
+        updated_at=timezone.now(),
+    )
+    return claim(Appraiser(pk=appraiser_id))
+
+
+def complete_appraisals(user, results):
+    """Apply many appraisal results at once, all or none.
+
+    ``results`` are validated AppraisalResultSerializer items. Appraisers may
+    only complete their own assets; staff may complete any. Every asset must
+    still be pending and under appraisal. Raises ValidationError listing the
+    problems by asset; otherwise returns the updated assets.
+    """
+    is_staff = user.is_staff or user.is_superuser
+    appraiser_id = None if is_staff else Appraiser.objects.filter(user=user).values_list("pk", flat=True).first()
+    if not is_staff and appraiser_id is None:
+        raise ValidationError({"error": "You are not an appraiser."})
+
+    assets = Asset.objects.in_bulk([result["asset"] for result in results])
+    errors = {}
+    for result in results:
+        asset = assets.get(result["asset"])
+        if asset is None or (not is_staff and asset.appraiser_id != appraiser_id):
+            errors[result["asset"]] = "You are not the assigned appraiser for this asset."
+        elif asset.appraise_status != AssetAppraisalStatus.UNDER_APPRAISAL or asset.status != AssetStatus.PENDING:
+            errors[result["asset"]] = "This asset is not under appraisal."
+        elif result["successful"] and result.get("appraised_value", asset.appraised_value) is None:
+            errors[result["asset"]] = "A successful appraisal needs an appraised value."
+    if errors:
+        raise ValidationError(errors)
+
+    now = timezone.now()
+    updated = []
+    for result in results:
+        asset = assets[result["asset"]]
+        if result["successful"]:
+            asset.appraise_status = AssetAppraisalStatus.APPRAISAL_SUCCESSFUL
+            asset.appraised_value = result.get("appraised_value", asset.appraised_value)
+        else:
+            asset.appraise_status = AssetAppraisalStatus.APPRAISAL_FAILED
+            asset.appraised_value = None
+        asset.appraisal_at = now
+        asset.updated_at = now
+        updated.append(asset)
+
+    with transaction.atomic():
+        # Only rows still under appraisal are written, so a concurrent completion is not overwritten.
+        locked = Asset.objects.filter(
+            pk__in=assets, appraise_status=AssetAppraisalStatus.UNDER_APPRAISAL,
+        ).select_for_update().values_list("pk", flat=True)
+        if len(locked) != len(updated):
+            raise ValidationError({"error": "Some assets were completed by another request."})
+        Asset.objects.bulk_update(updated, ["appraise_status", "appraised_value", "appraisal_at", "updated_at"])
+    for finished_appraiser_id, count in Counter(asset.appraiser_id for asset in updated).items():
+        if finished_appraiser_id is not None:
+            release(finished_appraiser_id, count)
+    return updated
@@ -0,0 +1,42 @@
+from .enums import AssetMediaType
+
+MEDIA_EXTENSIONS = {
+    AssetMediaType.IMAGE: ["jpeg", "jpg", "png", "gif", "bmp", "tiff", "svg"],
+    AssetMediaType.VIDEO: ["mp4", "avi", "mov", "mkv", "wmv", "flv"],
+    AssetMediaType.DOCUMENT: ["doc", "docx", "pdf", "txt", "rtf", "odt", "ppt", "pptx", "xls", "xlsx"],
+}
+
+# Most media of one type an asset may have; types not listed are unlimited.
+MEDIA_LIMITS = {
+    AssetMediaType.IMAGE: 20,
+    AssetMediaType.VIDEO: 10,
+}
+
+UPLOAD_MAX_SIZE = 4 * 1024 * 1024 * 1024  # 4 GB
+UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024  # 16 MB
+UPLOAD_READ_SIZE = 64 * 1024  # bytes read from the request stream at a time
+UPLOAD_LOCK_TIMEOUT = 5 * 60  # seconds
+UPLOAD_EXPIRY = 24 * 60 * 60  # seconds an upload may go without a chunk before it is aborted
+
+MEDIA_BLOB_DIR = "asset_media/blobs"
+MEDIA_BLOB_DELETE_DELAY = 10 * 60  # seconds an unreferenced blob is kept
+MEDIA_BLOB_LOCK_TIMEOUT = 30  # seconds a blob's reuse or deletion may hold its lock
+MEDIA_BLOB_LOCK_WAIT = 10  # seconds to wait for a blob's lock
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # seconds, for content-versioned URLs
+MEDIA_STREAM_CHUNK_SIZE = 256 * 1024  # bytes per chunk of a streamed byte range
+MEDIA_RECOUNT_CHUNK_SIZE = 1000  # assets whose media counters are recomputed per transaction
+
+APPRAISAL_BATCH_MAX_SIZE = 500  # results accepted by one batch appraisal request
+
+INTAKE_BATCH_SIZE = 500  # manifest rows validated and inserted together
+INTAKE_MAX_ERRORS = 1000  # rows reported back in the intake error report
+
+# Resized copies generated for every uploaded image: name -> bounding box.
+IMAGE_VARIANTS = {
+    "thumbnail": (320, 320),
+    "web": (1280, 1280),
+}
+IMAGE_VARIANT_FORMAT = "WEBP"
+IMAGE_VARIANT_QUALITY = 80
+
+FFPROBE_TIMEOUT = 30  # seconds allowed to read a video's duration
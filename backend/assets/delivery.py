@@ -0,0 +1,116 @@
+"""Serve AssetMedia content after the API has checked permissions.
+
+Media blobs are content-addressed, so their name doubles as a strong ETag.
+Requests carrying the current ``v`` query parameter (see ``content_url``)
+are cached as immutable. With MEDIA_SENDFILE['BACKEND'] set, the bytes are
+handed to the front web server (``x-sendfile`` for Apache/lighttpd,
+``x-accel-redirect`` for nginx), which also answers Range requests; otherwise
+Django streams them, using the server's zero-copy file wrapper for whole
+files and answering single byte ranges with 206.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import quote_etag
+
+from assets import constants
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def content_version(file):
+    """Blob and variant names are unique per content, so the name is the version."""
+    return os.path.splitext(os.path.basename(file.name))[0]
+
+
+def content_url(media, request=None, variant=None):
+    """The protected URL of ``media``, or of one of its AssetMediaVariants."""
+    file = variant.file if variant is not None else media.file
+    url = f"{reverse('asset-media-content', args=[media.pk])}?v={content_version(file)}"
+    if variant is not None:
+        url += f"&variant={variant.name}"
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def _parse_range(header, size):
+    """Return ``(start, end)`` for a single satisfiable byte range, or None."""
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        return None
+    return (start, end) if start <= end else None
+
+
+def _read_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            data = f.read(min(constants.MEDIA_STREAM_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def serve_media(request, media, variant=None):
+    """Send ``media``'s file, or ``variant``'s when given."""
+    file = variant.file if variant is not None else media.file
+    etag = quote_etag(content_version(file))
+    if request.GET.get("v") == content_version(file):
+        cache_control = f"private, max-age={constants.MEDIA_CACHE_MAX_AGE}, immutable"
+    else:
+        # The unversioned URL may point at new content after an update.
+        cache_control = "private, no-cache"
+
+    if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        return response
+
+    storage = file.storage
+    name = file.name
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    backend = settings.MEDIA_SENDFILE["BACKEND"]
+    range_header = request.headers.get("Range")
+    if range_header and request.headers.get("If-Range", etag) != etag:
+        range_header = None
+
+    if backend == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = storage.path(name)
+    elif backend == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_SENDFILE["ACCEL_PREFIX"] + name
+    else:
+        path = storage.path(name)
+        size = os.path.getsize(path)
+        byte_range = _parse_range(range_header, size) if range_header else None
+        if range_header and byte_range is None and RANGE_RE.match(range_header.replace(" ", "")):
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        if byte_range is None:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(_read_range(path, start, end), status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+        response["Accept-Ranges"] = "bytes"
+
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control
+    return response
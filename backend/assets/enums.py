@@ -28,3 +28,8 @@ class AssetCategory(models.TextChoices):
     TECHNOLOGY_ELECTRONICS_ENGINEERING = 'technology_electronics_engineering', 'Technology, Electronics, Engineering'
     OTHERS = 'others', 'Others'
 
+
+class UploadStatus(models.TextChoices):
+    UPLOADING = 'uploading', 'Uploading'
+    COMPLETED = 'completed', 'Completed'
+    ABORTED = 'aborted', 'Aborted'
@@ -0,0 +1,164 @@
+"""Bulk asset intake from a CSV or JSONL manifest and an optional zip of media.
+
+The manifest is read one row at a time and processed in chunks of
+INTAKE_BATCH_SIZE: rows are validated with AssetSerializer, the valid ones
+are inserted with ``bulk_create`` and their media copied out of the archive
+into media storage, one transaction per chunk. Memory use depends on the
+chunk size, not on the manifest; the error report keeps at most
+INTAKE_MAX_ERRORS rows.
+
+Each row holds the writable AssetSerializer fields, plus an optional
+``media`` column listing archive paths separated by ``;`` (in JSONL, a list
+of paths works too). The media type of each file follows from its extension.
+"""
+import codecs
+import csv
+import json
+import os
+import zipfile
+from itertools import islice
+
+from django.core.files import File
+from django.db import connection, transaction
+from django_q.tasks import async_task
+
+from .models import Asset, AssetMedia
+from .serializers import AssetSerializer
+from .storage import media_storage
+from .media import COUNT_FIELDS
+from assets import constants
+
+
+def read_manifest(stream, manifest_format):
+    """Yield ``(row number, dict)`` pairs from a binary ``stream``."""
+    lines = codecs.iterdecode(stream, "utf-8-sig")
+    if manifest_format == "csv":
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            # Empty cells mean "not given", so model defaults apply.
+            yield number, {key: value for key, value in row.items() if key and value not in ("", None)}
+    elif manifest_format == "jsonl":
+        for number, line in enumerate(lines, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, e
+    else:
+        raise ValueError(f"Unsupported manifest format: {manifest_format}")
+
+
+def manifest_format(filename):
+    return os.path.splitext(filename)[1].lstrip(".").lower()
+
+
+def _media_type(path):
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    for media_type, extensions in constants.MEDIA_EXTENSIONS.items():
+        if extension in extensions:
+            return media_type
+    return None
+
+
+def _validate(row, members):
+    """Return ``(validated asset data, [(path, media type)], errors)`` for one row."""
+    if not isinstance(row, dict):
+        return None, [], {"non_field_errors": [f"Invalid row: {row}"]}
+    row = dict(row)
+    # CSV cells hold ";"-separated paths; JSONL rows may also give a list.
+    paths = row.pop("media", None)
+    media, media_errors = [], []
+    if paths is None:
+        paths = []
+    elif isinstance(paths, str):
+        paths = paths.split(";")
+    if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+        media_errors.append("Must be a list of paths or a ';'-separated string of paths.")
+        paths = []
+    paths = [path.strip() for path in paths if path.strip()]
+
+    serializer = AssetSerializer(data=row)
+    errors = {} if serializer.is_valid() else dict(serializer.errors)
+
+    for path in paths:
+        media_type = _media_type(path)
+        if media_type is None:
+            media_errors.append(f"'{path}' has an extension that is not allowed.")
+        elif path not in members:
+            media_errors.append(f"'{path}' is not in the media archive.")
+        else:
+            media.append((path, media_type))
+    for media_type, limit in constants.MEDIA_LIMITS.items():
+        if sum(1 for _, t in media if t == media_type) > limit:
+            media_errors.append(f"At most {limit} {media_type}s are allowed.")
+    if media_errors:
+        errors["media"] = media_errors
+    return (None if errors else serializer.validated_data), media, errors
+
+
+def _insert(batch, seller, archive):
+    """Create the assets and media of one validated chunk; return the new media ids."""
+    assets = []
+    for data, media in batch:
+        asset = Asset(**data, seller=seller)
+        for media_type, field in COUNT_FIELDS.items():
+            setattr(asset, field, sum(1 for _, t in media if t == media_type))
+        assets.append(asset)
+
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Asset.objects.bulk_create(assets)
+        else:
+            # Without returned ids only assets that need no media can go in bulk.
+            Asset.objects.bulk_create([asset for asset, (_, media) in zip(assets, batch) if not media])
+            for asset, (_, media) in zip(assets, batch):
+                if media:
+                    asset.save()
+
+        asset_media = []
+        for asset, (_, media) in zip(assets, batch):
+            for path, media_type in media:
+                with archive.open(path) as member:
+                    name = media_storage.save(os.path.basename(path), File(member))
+                asset_media.append(AssetMedia(asset=asset, media_type=media_type, file=name))
+        AssetMedia.objects.bulk_create(asset_media)
+
+    if connection.features.can_return_rows_from_bulk_insert or not asset_media:
+        return [media.pk for media in asset_media]
+    return list(AssetMedia.objects.filter(asset__in=[asset for asset, (_, media) in zip(assets, batch) if media])
+                .values_list("pk", flat=True))
+
+
+def import_assets(manifest, manifest_format, seller, archive=None):
+    """Import every row of ``manifest`` for ``seller``; ``archive`` is a zip file object.
+
+    Returns ``{"created", "failed", "errors"}``, where ``errors`` lists up to
+    INTAKE_MAX_ERRORS ``{"row", "errors"}`` entries.
+    """
+    zip_file = zipfile.ZipFile(archive) if archive is not None else None
+    members = {info.filename for info in zip_file.infolist() if not info.is_dir()} if zip_file else set()
+
+    report = {"created": 0, "failed": 0, "errors": []}
+    rows = read_manifest(manifest, manifest_format)
+    try:
+        while True:
+            chunk = list(islice(rows, constants.INTAKE_BATCH_SIZE))
+            if not chunk:
+                break
+            batch = []
+            for number, row in chunk:
+                data, media, errors = _validate(row, members)
+                if errors:
+                    report["failed"] += 1
+                    if len(report["errors"]) < constants.INTAKE_MAX_ERRORS:
+                        report["errors"].append({"row": number, "errors": errors})
+                else:
+                    batch.append((data, media))
+            if batch:
+                media_ids = _insert(batch, seller, zip_file)
+                report["created"] += len(batch)
+                if media_ids:
+                    transaction.on_commit(lambda ids=media_ids: async_task("assets.tasks.process_media_batch", ids))
+    finally:
+        if zip_file is not None:
+            zip_file.close()
+    return report
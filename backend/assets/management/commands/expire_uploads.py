@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from assets.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    help = "Abort resumable media uploads that stopped receiving chunks and delete their part files."
+
+    def handle(self, *args, **options):
+        expired = expire_uploads()
+        self.stdout.write(self.style.SUCCESS(f"Aborted {expired} abandoned uploads"))
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.intake import import_assets, manifest_format
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Create assets for a seller from a CSV or JSONL manifest and an optional zip of media."
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest')
+        parser.add_argument('--seller', required=True, help="Email of the selling user.")
+        parser.add_argument('--media', help="Zip archive holding the files named in the manifest's media column.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'])
+
+    def handle(self, *args, **options):
+        seller = User.objects.filter(email=options['seller']).first()
+        if seller is None:
+            raise CommandError(f"No user with email {options['seller']}.")
+        manifest_type = options['format'] or manifest_format(options['manifest'])
+        if manifest_type not in ('csv', 'jsonl'):
+            raise CommandError("Pass --format for manifests without a .csv or .jsonl extension.")
+
+        archive = open(options['media'], 'rb') if options['media'] else None
+        try:
+            with open(options['manifest'], 'rb') as manifest:
+                report = import_assets(manifest, manifest_type, seller, archive)
+        finally:
+            if archive is not None:
+                archive.close()
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(f"Created {report['created']} assets, {report['failed']} rows failed"))
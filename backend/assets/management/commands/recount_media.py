@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from assets.media import recount_media
+
+
+class Command(BaseCommand):
+    help = "Recompute every asset's per-type media counters from its media rows."
+
+    def handle(self, *args, **options):
+        changed = recount_media()
+        self.stdout.write(self.style.SUCCESS(f"Corrected the media counters of {changed} assets"))
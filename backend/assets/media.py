@@ -0,0 +1,91 @@
+"""Per-asset media counters, kept in step with the AssetMedia rows.
+
+Each Asset carries one counter per media type. Adding media takes a slot
+with a single conditional UPDATE, so the limit holds under concurrent
+uploads without counting rows; deleting media gives the slot back (see
+``assets.signals``). ``recount_media`` recomputes the counters from the
+rows, for assets created before the counters existed or after a drift.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+from rest_framework.exceptions import ValidationError
+
+from .models import Asset, AssetMedia
+from .enums import AssetMediaType
+from assets import constants
+
+COUNT_FIELDS = {
+    AssetMediaType.IMAGE: "image_count",
+    AssetMediaType.VIDEO: "video_count",
+    AssetMediaType.DOCUMENT: "document_count",
+}
+
+
+def _limit_error(media_type):
+    return ValidationError(
+        f"This asset already has the maximum number of {media_type}s ({constants.MEDIA_LIMITS[media_type]})."
+    )
+
+
+def check_media_slot(asset, media_type):
+    """Fail early, from the loaded counters, when ``asset`` has no room left."""
+    if media_type not in COUNT_FIELDS:
+        raise ValidationError(f"Invalid media type: {media_type}")
+    limit = constants.MEDIA_LIMITS.get(media_type)
+    if limit is not None and getattr(asset, COUNT_FIELDS[media_type]) >= limit:
+        raise _limit_error(media_type)
+
+
+def reserve_media_slot(asset_id, media_type):
+    """Count one more ``media_type`` on the asset; call inside the transaction creating the media."""
+    field = COUNT_FIELDS[media_type]
+    assets = Asset.objects.filter(pk=asset_id)
+    limit = constants.MEDIA_LIMITS.get(media_type)
+    if limit is not None:
+        assets = assets.filter(**{f"{field}__lt": limit})
+    if not assets.update(**{field: F(field) + 1}):
+        raise _limit_error(media_type)
+
+
+def release_media_slot(asset_id, media_type):
+    field = COUNT_FIELDS.get(media_type)
+    if field:
+        Asset.objects.filter(pk=asset_id, **{f"{field}__gt": 0}).update(**{field: F(field) - 1})
+
+
+def recount_media():
+    """Set every asset's media counters to the number of its AssetMedia rows.
+
+    Works through the assets in chunks, each in its own transaction with the
+    chunk's assets locked so concurrent uploads wait rather than being lost.
+    Returns the number of assets whose counters changed.
+    """
+    fields = list(COUNT_FIELDS.values())
+    changed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            assets = list(
+                Asset.objects.select_for_update().filter(pk__gt=last_pk).order_by("pk")
+                .only("pk", *fields)[:constants.MEDIA_RECOUNT_CHUNK_SIZE]
+            )
+            if not assets:
+                return changed
+            last_pk = assets[-1].pk
+            counts = defaultdict(dict)
+            for asset_id, media_type, count in (
+                AssetMedia.objects.filter(asset__in=assets).values("asset_id", "media_type")
+                .annotate(count=Count("pk")).values_list("asset_id", "media_type", "count")
+            ):
+                counts[asset_id][media_type] = count
+            stale = []
+            for asset in assets:
+                actual = {field: counts[asset.pk].get(media_type, 0) for media_type, field in COUNT_FIELDS.items()}
+                if any(getattr(asset, field) != count for field, count in actual.items()):
+                    for field, count in actual.items():
+                        setattr(asset, field, count)
+                    stale.append(asset)
+            Asset.objects.bulk_update(stale, fields)
+            changed += len(stale)
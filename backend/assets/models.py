@@ -1,11 +1,15 @@
+import uuid
+
 from django.db import models
 from users.models import User
+from .storage import media_storage
 from .enums import (
     AssetStatus,
     AppraiserStatus,
     AssetAppraisalStatus,
     AssetMediaType,
     AssetCategory,
+    UploadStatus,
 )
 
 
@@ -17,9 +21,19 @@ class Appraiser(models.Model):
     status = models.CharField(
         max_length=50, choices=AppraiserStatus.choices, default=AppraiserStatus.ACTIVE
     )
+    # Queued assets of this category are offered to the appraiser first.
+    specialty = models.CharField(max_length=100, choices=AssetCategory.choices, blank=True)
+    max_assignments = models.PositiveIntegerField(default=1)
+    active_assignments = models.PositiveIntegerField(default=0)
+    last_assigned_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "active_assignments"]),
+        ]
+
     def __str__(self):
         return f"Appraiser: {self.user.first_name} {self.user.last_name}"
 
@@ -62,9 +76,20 @@ class Asset(models.Model):
         max_digits=12, decimal_places=2, null=True, blank=True
     )
     appraisal_at = models.DateTimeField(null=True, blank=True)
+    appraisal_queued_at = models.DateTimeField(null=True, blank=True)
+    # Maintained by assets.media; read these instead of counting media rows.
+    image_count = models.PositiveIntegerField(default=0)
+    video_count = models.PositiveIntegerField(default=0)
+    document_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["appraiser", "appraise_status"]),
+            models.Index(fields=["appraise_status", "category", "appraisal_queued_at"]),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -75,6 +100,54 @@ def asset_media_upload_to(instance, filename):
 class AssetMedia(models.Model):
     asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name="media")
     media_type = models.CharField(max_length=20, choices=AssetMediaType.choices)
-    file = models.FileField(upload_to=asset_media_upload_to)
+    # Indexed: blob deletion looks up the media still referring to a blob.
+    file = models.FileField(upload_to=asset_media_upload_to, storage=media_storage, max_length=255, db_index=True)
+    # Filled in by assets.tasks.extract_media_metadata after upload.
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)  # seconds
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+
+class AssetMediaUpload(models.Model):
+    """A resumable, chunked upload that becomes an AssetMedia on completion."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name="media_uploads")
+    media_type = models.CharField(max_length=20, choices=AssetMediaType.choices)
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True)
+    status = models.CharField(
+        max_length=20, choices=UploadStatus.choices, default=UploadStatus.UPLOADING
+    )
+    media = models.OneToOneField(
+        AssetMedia, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload"
+    )
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="media_uploads")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def part_name(self):
+        return f"asset_media/{self.asset_id}/{self.media_type}/{self.id}.part"
+
+
+class AssetMediaVariant(models.Model):
+    """A resized, recompressed copy of an image AssetMedia."""
+
+    media = models.ForeignKey(AssetMedia, on_delete=models.CASCADE, related_name="variants")
+    name = models.CharField(max_length=20)
+    file = models.FileField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("media", "name")
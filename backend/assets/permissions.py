@@ -1,5 +1,5 @@
 from rest_framework.permissions import BasePermission
-from assets.enums import AssetAppraisalStatus
+from assets.enums import AssetAppraisalStatus, AssetStatus
 from users.permissions import IsStaffUser, IsAdminUser
 
 
@@ -7,6 +7,7 @@ class AssetPermission(BasePermission):
     def has_permission(self, request, view):
         if view.action in [
             "create",
+            "bulk_intake",
             "list",
             "retrieve",
             "update",
@@ -46,10 +47,16 @@ class AssetMediaPermission(BasePermission):
             "destroy",
         ]:
             return request.user.is_authenticated
-        return False
+        # Media of assets in an auction is public: the catalog lists those
+        # assets to anonymous visitors with their content URLs, and bidders
+        # need the photos before registering. Everything else stays limited
+        # to the seller and staff in has_object_permission.
+        return view.action == "content"
 
     def has_object_permission(self, request, view, obj):
-        if view.action in ["list", "retrieve"]:
+        if view.action == "content" and obj.asset.status == AssetStatus.IN_AUCTION:
+            return True
+        if view.action in ["list", "retrieve", "content"]:
             return (
                 obj.asset.seller == request.user
                 or request.user.is_staff
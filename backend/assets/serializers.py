@@ -1,16 +1,33 @@
 from rest_framework import serializers
 from assets.enums import AssetMediaType
-from .models import Appraiser, Asset, AssetMedia
+from django.utils.text import get_valid_filename
+from .constants import APPRAISAL_BATCH_MAX_SIZE, MEDIA_EXTENSIONS, UPLOAD_MAX_SIZE
+from .models import Appraiser, Asset, AssetMedia, AssetMediaUpload
+from .delivery import content_url
 
 
 class AppraiserSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appraiser
-        fields = ["id", "user", "experiences", "status", "created_at", "updated_at"]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        fields = [
+            "id",
+            "user",
+            "experiences",
+            "status",
+            "specialty",
+            "max_assignments",
+            "active_assignments",
+            "last_assigned_at",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["id", "active_assignments", "last_assigned_at", "created_at", "updated_at"]
 
 
 class AssetMediaSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+    content_url = serializers.SerializerMethodField()
+
     class Meta:
         model = AssetMedia
         fields = [
@@ -18,11 +35,36 @@ class AssetMediaSerializer(serializers.ModelSerializer):
             "asset",
             "media_type",
             "file",
+            "content_url",
+            "variants",
+            "file_size",
+            "mime_type",
+            "width",
+            "height",
+            "duration",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
-        
+        read_only_fields = [
+            "id",
+            "content_url",
+            "variants",
+            "file_size",
+            "mime_type",
+            "width",
+            "height",
+            "duration",
+            "created_at",
+            "updated_at",
+        ]
+
+    def get_variants(self, obj):
+        request = self.context.get("request")
+        return {variant.name: content_url(obj, request, variant) for variant in obj.variants.all()}
+
+    def get_content_url(self, obj):
+        return content_url(obj, self.context.get("request"))
+
     def validate_file_extension(self, file, valid_extensions):
         ext = file.name.split(".")[-1].lower()
         if ext not in valid_extensions:
@@ -39,45 +81,79 @@ class AssetMediaSerializer(serializers.ModelSerializer):
 
         files = request.FILES.getlist("file")
 
-        if media_type == AssetMediaType.IMAGE:
-            if len(files) != 1:
-                raise serializers.ValidationError(
-                    "For images, you must upload exactly 1 file."
-                )
-            valid_extensions = ["jpeg", "jpg", "png", "gif", "bmp", "tiff", "svg"]
-        elif media_type == AssetMediaType.VIDEO:
-            if len(files) != 1:
-                raise serializers.ValidationError(
-                    "For videos, you must upload exactly 1 file."
-                )
-            valid_extensions = ["mp4", "avi", "mov", "mkv", "wmv", "flv"]
-        elif media_type == AssetMediaType.DOCUMENT:
-            if len(files) != 1:
-                raise serializers.ValidationError(
-                    "For documents, you must upload exactly 1 file."
-                )
-            valid_extensions = [
-                "doc",
-                "docx",
-                "pdf",
-                "txt",
-                "rtf",
-                "odt",
-                "ppt",
-                "pptx",
-                "xls",
-                "xlsx",
-            ]
-        else:
+        if media_type not in MEDIA_EXTENSIONS:
             raise serializers.ValidationError("Invalid media type.")
+        if len(files) != 1:
+            raise serializers.ValidationError(
+                f"For {media_type}s, you must upload exactly 1 file."
+            )
+        valid_extensions = MEDIA_EXTENSIONS[media_type]
 
         for file in files:
             self.validate_file_extension(file, valid_extensions)
 
         return data
 
+class AssetMediaUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AssetMediaUpload
+        fields = [
+            "id",
+            "asset",
+            "media_type",
+            "filename",
+            "total_size",
+            "received_size",
+            "checksum",
+            "status",
+            "media",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "id",
+            "received_size",
+            "checksum",
+            "status",
+            "media",
+            "created_at",
+            "updated_at",
+        ]
+
+    def validate_filename(self, value):
+        return get_valid_filename(value.split("/")[-1].split("\\")[-1])
+
+    def validate_total_size(self, value):
+        if not 0 < value <= UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File size must be between 1 and {UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
+
+    def validate(self, data):
+        media_type = data.get("media_type")
+        if media_type not in MEDIA_EXTENSIONS:
+            raise serializers.ValidationError("Invalid media type.")
+        ext = data["filename"].split(".")[-1].lower()
+        if ext not in MEDIA_EXTENSIONS[media_type]:
+            raise serializers.ValidationError(
+                f"File extension '{ext}' is not allowed for this media type."
+            )
+        return data
+
+
+class AssetMediaReadOnlySerializer(AssetMediaSerializer):
+    """Public media: bytes only through the content endpoint, never the storage URL."""
+
+    class Meta(AssetMediaSerializer.Meta):
+        fields = [field for field in AssetMediaSerializer.Meta.fields if field not in ("asset", "file")]
+        read_only_fields = fields
+
+
 class AssetReadOnlySerializer(serializers.ModelSerializer):
     auction_asset = serializers.SerializerMethodField()
+    media = AssetMediaReadOnlySerializer(many=True, read_only=True)
+
     class Meta:
         model = Asset
         fields = [
@@ -124,6 +200,9 @@ class AssetSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "media",
+            "image_count",
+            "video_count",
+            "document_count",
             "quantity",
             "seller",
             "winner",
@@ -131,6 +210,9 @@ class AssetSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             "id",
+            "image_count",
+            "video_count",
+            "document_count",
             "created_at",
             "updated_at",
             "appraise_status",
@@ -162,12 +244,15 @@ class AdminAssetSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "media",
+            "image_count",
+            "video_count",
+            "document_count",
             "quantity",
             "seller",
             "winner",
             "appraiser",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        read_only_fields = ["id", "image_count", "video_count", "document_count", "created_at", "updated_at"]
 
 
 class AssetAppraisalSerializer(serializers.ModelSerializer):
@@ -181,4 +266,24 @@ class AssetAppraisalSerializer(serializers.ModelSerializer):
     def validate_appraised_value(self, value):
         if value <= 0:
             raise serializers.ValidationError("Appraisal value must be a positive number")
-        return value
\ No newline at end of file
+        return value
+
+class AppraisalResultSerializer(serializers.Serializer):
+    asset = serializers.IntegerField()
+    successful = serializers.BooleanField()
+    appraised_value = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+
+    def validate_appraised_value(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Appraisal value must be a positive number")
+        return value
+
+
+class AppraisalBatchSerializer(serializers.Serializer):
+    results = AppraisalResultSerializer(many=True, allow_empty=False, max_length=APPRAISAL_BATCH_MAX_SIZE)
+
+    def validate_results(self, results):
+        asset_ids = [result["asset"] for result in results]
+        if len(set(asset_ids)) != len(asset_ids):
+            raise serializers.ValidationError("Each asset may appear only once.")
+        return results
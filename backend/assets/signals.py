@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from american_auction.scheduling import run_at
+from .models import AssetMedia, AssetMediaVariant
+from .media import release_media_slot
+from assets import constants
+
+
+@receiver(post_delete, sender=AssetMedia)
+def release_media(sender, instance, **kwargs):
+    """Give back the asset's media slot and schedule the blob for removal.
+
+    The blob is deleted MEDIA_BLOB_DELETE_DELAY later, and only if no
+    AssetMedia refers to it then, giving an upload of the same content that
+    found the blob in place time to commit its own reference. The schedule is
+    written in the deleting transaction, so a rollback cancels it.
+    """
+    release_media_slot(instance.asset_id, instance.media_type)
+    name = instance.file.name
+    if name:
+        run_at('assets.tasks.delete_media_blob', name,
+               at=timezone.now() + timedelta(seconds=constants.MEDIA_BLOB_DELETE_DELAY))
+
+
+@receiver(post_delete, sender=AssetMediaVariant)
+def delete_variant_file(sender, instance, **kwargs):
+    """Variant files belong to one row, so they go with it (including by cascade)."""
+    name = instance.file.name
+    if name:
+        transaction.on_commit(lambda: default_storage.delete(name))
@@ -0,0 +1,94 @@
+"""Content-addressed storage for asset media.
+
+Every file is stored once, under the SHA-256 of its content, so re-listed
+assets and resubmitted media share one blob on disk. The name a file is
+saved under only contributes its extension. A blob whose content is already
+stored is not written again; blobs are removed once no AssetMedia refers to
+them (see ``assets.signals``).
+
+Reusing a stored blob refreshes its modification time under the blob's
+lock, and ``assets.tasks.delete_media_blob`` checks references and that time
+under the same lock, so a blob an upload has just found in place is not
+deleted before the upload commits its AssetMedia.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from american_auction.locking import cache_lock
+from assets import constants
+
+
+def blob_name(digest, extension):
+    return f"{constants.MEDIA_BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+
+def blob_lock(name):
+    return cache_lock(f"media_blob:{name}:lock", constants.MEDIA_BLOB_LOCK_TIMEOUT,
+                      wait=constants.MEDIA_BLOB_LOCK_WAIT)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Equal names hold equal content, so an existing file is never clobbered.
+        return name
+
+    def reuse(self, name):
+        """Whether blob ``name`` is stored; if so it counts as freshly written."""
+        with blob_lock(name):
+            if not self.exists(name):
+                return False
+            os.utime(self.path(name))
+            return True
+
+    def _save(self, name, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        name = blob_name(sha256.hexdigest(), os.path.splitext(name)[1])
+        if self.reuse(name):
+            return name
+
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write next to the blob and rename, so a blob is either complete or absent.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    temp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def name_for_path(self, path, name):
+        """The blob name the local file at ``path`` would be stored under."""
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(constants.UPLOAD_READ_SIZE), b''):
+                sha256.update(chunk)
+        return blob_name(sha256.hexdigest(), os.path.splitext(name)[1])
+
+    def move_path(self, path, name):
+        """Move the local file at ``path`` into storage as blob ``name`` (see ``name_for_path``).
+
+        The file is dropped instead when its content is already stored.
+        """
+        if self.reuse(name):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+            os.replace(path, self.path(name))
+        return name
+
+
+media_storage = ContentAddressedStorage()
@@ -0,0 +1,154 @@
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import subprocess
+import time
+from datetime import datetime, timezone as dt_timezone
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django_q.tasks import async_task
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import AssetMedia, AssetMediaVariant
+from american_auction.scheduling import run_at
+from .storage import blob_lock, media_storage
+from .enums import AssetMediaType
+from assets import constants
+
+logger = logging.getLogger(__name__)
+
+
+def _render(image, box):
+    variant = image.copy()
+    variant.thumbnail(box, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, constants.IMAGE_VARIANT_FORMAT, quality=constants.IMAGE_VARIANT_QUALITY, method=4)
+    return variant.size, buffer.getvalue()
+
+
+def generate_media_variants(media_id):
+    """Create or replace every IMAGE_VARIANTS copy of an image AssetMedia.
+
+    Returns the names of the variants written.
+    """
+    media = AssetMedia.objects.filter(pk=media_id, media_type=AssetMediaType.IMAGE).first()
+    if media is None:
+        return []
+
+    try:
+        with media.file.open("rb") as source:
+            image = Image.open(source)
+            # Let JPEG decode at a reduced scale when the largest variant allows it.
+            image.draft("RGB", max(constants.IMAGE_VARIANTS.values()))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except (UnidentifiedImageError, OSError) as e:
+        # Formats Pillow cannot rasterize (e.g. SVG) are served as uploaded.
+        logger.info("No variants for media %s: %s", media_id, e)
+        return []
+
+    stem = os.path.splitext(os.path.basename(media.file.name))[0]
+    extension = constants.IMAGE_VARIANT_FORMAT.lower()
+    variants = []
+    for name, box in constants.IMAGE_VARIANTS.items():
+        (width, height), content = _render(image, box)
+        path = default_storage.save(
+            f"asset_media/{media.asset_id}/{media.media_type}/variants/{stem}_{name}.{extension}",
+            ContentFile(content),
+        )
+        variants.append(AssetMediaVariant(
+            media=media, name=name, file=path, width=width, height=height, size=len(content),
+        ))
+
+    with transaction.atomic():
+        # Deleting the old rows removes their files (see assets.signals).
+        AssetMediaVariant.objects.filter(media=media).delete()
+        AssetMediaVariant.objects.bulk_create(variants)
+    return [variant.name for variant in variants]
+
+
+def delete_media_blob(name):
+    """Delete a stored blob unless an AssetMedia still refers to it.
+
+    A blob reused within MEDIA_BLOB_DELETE_DELAY may belong to an upload that
+    has not committed yet, so its deletion is rescheduled instead.
+    """
+    with blob_lock(name):
+        if AssetMedia.objects.filter(file=name).exists():
+            return False
+        try:
+            reused_at = os.path.getmtime(media_storage.path(name))
+        except FileNotFoundError:
+            return False
+        due = reused_at + constants.MEDIA_BLOB_DELETE_DELAY
+        if due > time.time():
+            run_at("assets.tasks.delete_media_blob", name, at=datetime.fromtimestamp(due, tz=dt_timezone.utc))
+            return False
+        media_storage.delete(name)
+    return True
+
+
+def _video_duration(path):
+    """The duration in seconds as reported by ffprobe, or None when it is unavailable."""
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe:
+        return None
+    try:
+        output = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "json", path],
+            capture_output=True, check=True, timeout=constants.FFPROBE_TIMEOUT,
+        ).stdout
+        return float(json.loads(output)["format"]["duration"])
+    except (OSError, subprocess.SubprocessError, ValueError, KeyError) as e:
+        logger.info("Could not read the duration of %s: %s", path, e)
+        return None
+
+
+def extract_media_metadata(media_id):
+    """Store the size, MIME type, and dimensions or duration of an AssetMedia file."""
+    media = AssetMedia.objects.filter(pk=media_id).first()
+    if media is None:
+        return None
+
+    storage = media.file.storage
+    metadata = {
+        "file_size": storage.size(media.file.name),
+        "mime_type": mimetypes.guess_type(media.file.name)[0] or "",
+        "width": None,
+        "height": None,
+        "duration": None,
+    }
+    if media.media_type == AssetMediaType.IMAGE:
+        try:
+            with media.file.open("rb") as source:
+                # Opening only reads the header; the pixels are never decoded.
+                image = Image.open(source)
+                metadata["width"], metadata["height"] = image.size
+                metadata["mime_type"] = image.get_format_mimetype() or metadata["mime_type"]
+        except (UnidentifiedImageError, OSError):
+            pass
+    elif media.media_type == AssetMediaType.VIDEO:
+        metadata["duration"] = _video_duration(storage.path(media.file.name))
+
+    AssetMedia.objects.filter(pk=media_id).update(**metadata)
+    return metadata
+
+
+def process_media(media_id):
+    extract_media_metadata(media_id)
+    generate_media_variants(media_id)
+
+
+def process_media_batch(media_ids):
+    for media_id in media_ids:
+        process_media(media_id)
+
+
+def schedule_media_processing(media):
+    """Extract metadata and, for images, render variants once the media is committed."""
+    transaction.on_commit(lambda: async_task("assets.tasks.process_media", media.id))
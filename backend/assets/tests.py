@@ -1,3 +1,63 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+from .enums import AssetCategory, AssetMediaType, AssetStatus
+from .models import Asset, AssetMedia
+from .storage import media_storage
+
+
+class AssetMediaContentPermissionTests(TestCase):
+    """The content endpoint opens media of assets in an auction to everyone, and nothing else."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller@example.com", "password", first_name="Sam", last_name="Seller")
+        self.outsider = User.objects.create_user("outsider@example.com", "password", first_name="Oli", last_name="Outsider")
+        self.client = APIClient()
+
+    def _media(self, asset_status):
+        asset = Asset.objects.create(
+            name="Lamp", description="Brass lamp", category=AssetCategory.ARTWORKS_ANTIQUES_COLLECTIBLES,
+            size="small", warehouse="North", origin="France", status=asset_status, seller=self.seller,
+        )
+        name = media_storage.save("lamp.txt", ContentFile(f"lamp {asset.pk}".encode()))
+        return AssetMedia.objects.create(asset=asset, media_type=AssetMediaType.DOCUMENT, file=name)
+
+    def _get(self, media):
+        return self.client.get(reverse("asset-media-content", args=[media.pk]))
+
+    def test_outsider_is_denied_media_of_assets_not_in_an_auction(self):
+        self.client.force_authenticate(self.outsider)
+        for asset_status in (AssetStatus.PENDING, AssetStatus.SOLD):
+            with self.subTest(asset_status=asset_status):
+                self.assertEqual(self._get(self._media(asset_status)).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_anonymous_is_denied_media_of_pending_assets(self):
+        response = self._get(self._media(AssetStatus.PENDING))
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_seller_gets_media_of_pending_assets(self):
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self._get(self._media(AssetStatus.PENDING)).status_code, status.HTTP_200_OK)
+
+    def test_anyone_gets_media_of_assets_in_an_auction(self):
+        self.assertEqual(self._get(self._media(AssetStatus.IN_AUCTION)).status_code, status.HTTP_200_OK)
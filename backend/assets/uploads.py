@@ -0,0 +1,182 @@
+"""Resumable chunked uploads written straight into media storage.
+
+Chunks are appended to ``<upload id>.part`` in the asset's media directory
+as they are read from the request stream, so nothing is buffered in memory
+or in temporary files. Each chunk carries a SHA-256 digest that is verified
+while it is written, and is folded into the upload's chained checksum. On
+completion the AssetMedia row is created and, once that commits, the part
+file is moved into content-addressed storage, or dropped when the same
+content is already stored. Uploads left untouched for UPLOAD_EXPIRY are
+aborted, and their part files deleted, by ``expire_uploads``.
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from american_auction.locking import LockUnavailable, cache_lock
+from .models import AssetMedia, AssetMediaUpload
+from .enums import UploadStatus
+from .storage import media_storage
+from .tasks import schedule_media_processing
+from .media import reserve_media_slot
+from assets import constants
+
+logger = logging.getLogger(__name__)
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The upload is not in the expected state."
+    default_code = 'upload_conflict'
+
+
+def chain_checksum(previous, chunk_digest):
+    """Fold one chunk's SHA-256 hex digest into the running upload checksum."""
+    return hashlib.sha256(f"{previous}{chunk_digest}".encode()).hexdigest()
+
+
+def _lock_key(upload):
+    return f"asset_media_upload:{upload.pk}:lock"
+
+
+class _locked:
+    """Allow one writer per upload at a time, across workers."""
+
+    def __init__(self, upload):
+        self.lock = cache_lock(_lock_key(upload), constants.UPLOAD_LOCK_TIMEOUT)
+
+    def __enter__(self):
+        try:
+            self.lock.__enter__()
+        except LockUnavailable:
+            raise UploadConflict("Another request is writing to this upload.")
+
+    def __exit__(self, *exc_info):
+        return self.lock.__exit__(*exc_info)
+
+
+def _check_in_progress(upload):
+    # Re-read under the lock; the caller's copy may be stale.
+    upload.refresh_from_db(fields=['status', 'received_size', 'checksum'])
+    if upload.status != UploadStatus.UPLOADING:
+        raise UploadConflict("This upload is no longer in progress.")
+
+
+def start_upload(upload):
+    path = default_storage.path(upload.part_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+
+def write_chunk(upload, stream, offset, length, digest):
+    """Write ``length`` bytes from ``stream`` at ``offset``, verifying ``digest``.
+
+    ``offset`` must equal the bytes received so far; a client that lost
+    track reads ``received_size`` from the upload and resumes from there.
+    """
+    if not 0 < length <= constants.UPLOAD_MAX_CHUNK_SIZE:
+        raise ValidationError(f"Chunks must be between 1 and {constants.UPLOAD_MAX_CHUNK_SIZE} bytes.")
+
+    with _locked(upload):
+        _check_in_progress(upload)
+        if offset != upload.received_size:
+            raise UploadConflict(f"Expected a chunk at offset {upload.received_size}.")
+        if offset + length > upload.total_size:
+            raise ValidationError("The chunk extends past the declared file size.")
+
+        sha256 = hashlib.sha256()
+        remaining = length
+        with open(default_storage.path(upload.part_name), 'r+b') as part:
+            part.seek(offset)
+            while remaining:
+                data = stream.read(min(constants.UPLOAD_READ_SIZE, remaining))
+                if not data:
+                    break
+                sha256.update(data)
+                part.write(data)
+                remaining -= len(data)
+            if remaining or sha256.hexdigest() != digest.lower():
+                # Drop the partial chunk so the client can resend it.
+                part.truncate(offset)
+                raise ValidationError("The chunk is incomplete or does not match its checksum.")
+            part.truncate(offset + length)
+
+        checksum = chain_checksum(upload.checksum, sha256.hexdigest())
+        AssetMediaUpload.objects.filter(pk=upload.pk, received_size=offset).update(
+            received_size=offset + length, checksum=checksum, updated_at=timezone.now())
+    upload.received_size = offset + length
+    upload.checksum = checksum
+    return upload
+
+
+def _move_into_place(path, name):
+    try:
+        media_storage.move_path(path, name)
+    except Exception:
+        # The media row is committed; leave the part file for an operator
+        # rather than failing a request whose upload did complete.
+        logger.exception("Could not move %s into media storage as %s", path, name)
+
+
+def complete_upload(upload, checksum=None):
+    """Create the AssetMedia row and move the finished file into place once it commits."""
+    with _locked(upload):
+        _check_in_progress(upload)
+        if upload.received_size != upload.total_size:
+            raise ValidationError(f"Received {upload.received_size} of {upload.total_size} bytes.")
+        if checksum and checksum.lower() != upload.checksum:
+            raise ValidationError("The upload does not match its checksum.")
+
+        path = default_storage.path(upload.part_name)
+        name = media_storage.name_for_path(path, upload.filename)
+        with transaction.atomic():
+            # Nothing is moved until the rows commit, so a failure (e.g. a
+            # full asset) leaves the part file in place and the upload resumable.
+            reserve_media_slot(upload.asset_id, upload.media_type)
+            media = AssetMedia.objects.create(asset_id=upload.asset_id, media_type=upload.media_type, file=name)
+            AssetMediaUpload.objects.filter(pk=upload.pk).update(
+                status=UploadStatus.COMPLETED, media=media, updated_at=timezone.now())
+            # Registered first, so the blob is in place before processing starts.
+            transaction.on_commit(lambda: _move_into_place(path, name))
+            schedule_media_processing(media)
+    upload.status = UploadStatus.COMPLETED
+    upload.media = media
+    return media
+
+
+def abort_upload(upload):
+    with _locked(upload):
+        _check_in_progress(upload)
+        AssetMediaUpload.objects.filter(pk=upload.pk).update(status=UploadStatus.ABORTED, updated_at=timezone.now())
+        default_storage.delete(upload.part_name)
+    upload.status = UploadStatus.ABORTED
+    return upload
+
+
+def expire_uploads():
+    """Abort uploads untouched for UPLOAD_EXPIRY and delete their part files.
+
+    Returns the number of uploads aborted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=constants.UPLOAD_EXPIRY)
+    expired = 0
+    for upload in AssetMediaUpload.objects.filter(status=UploadStatus.UPLOADING, updated_at__lt=cutoff).iterator():
+        try:
+            with _locked(upload):
+                # Re-checked under the lock: a chunk may have arrived meanwhile.
+                if not AssetMediaUpload.objects.filter(
+                        pk=upload.pk, status=UploadStatus.UPLOADING, updated_at__lt=cutoff,
+                ).update(status=UploadStatus.ABORTED, updated_at=timezone.now()):
+                    continue
+                default_storage.delete(upload.part_name)
+        except UploadConflict:
+            continue
+        expired += 1
+    return expired
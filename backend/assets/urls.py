@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AssetReadOnlyViewSet, AssetViewSet, AppraiserViewSet, AssetMediaViewSet
+from .views import AssetReadOnlyViewSet, AssetViewSet, AppraiserViewSet, AssetMediaViewSet, AssetMediaUploadViewSet
 
 router = DefaultRouter()
 router.register("assets", AssetViewSet, basename="assets")
 router.register("appraisers", AppraiserViewSet, basename="appraisers")
 router.register("asset-media", AssetMediaViewSet, basename="asset-media")
+router.register("asset-media-uploads", AssetMediaUploadViewSet, basename="asset-media-uploads")
 router.register("assets-read-only", AssetReadOnlyViewSet, basename="assets-read")
 
 urlpatterns = [
@@ -1,28 +1,42 @@
-from rest_framework import viewsets, permissions, status, filters
+import csv
+import zipfile
+
+from rest_framework import mixins, viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django.utils import timezone
+from django.db import transaction
 from assets.permissions import (
     AssetMediaPermission,
     AssetPermission,
 )
-from .models import Asset, Appraiser, AssetMedia
+from .models import Asset, Appraiser, AssetMedia, AssetMediaUpload
 from .serializers import (
     AdminAssetSerializer,
     AppraiserSerializer,
     AssetMediaSerializer,
+    AssetMediaUploadSerializer,
     AssetReadOnlySerializer,
     AssetSerializer,
     AssetAppraisalSerializer,
+    AppraisalBatchSerializer,
 )
-from .enums import AssetMediaType, AssetStatus, AppraiserStatus, AssetAppraisalStatus
+from .enums import AssetStatus, AssetAppraisalStatus
 from users.permissions import IsStaffUser
+from auctions.caching import get_or_build, asset_scope
+from .uploads import start_upload, write_chunk, complete_upload, abort_upload
+from .tasks import schedule_media_processing
+from .intake import import_assets, manifest_format
+from . import appraisal_queue
+from .media import check_media_slot, reserve_media_slot, release_media_slot
+from .delivery import serve_media
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 
 
 class AssetReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Asset.objects.filter(status=AssetStatus.IN_AUCTION)
+    queryset = Asset.objects.filter(status=AssetStatus.IN_AUCTION).prefetch_related("media__variants")
     serializer_class = AssetReadOnlySerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
@@ -31,6 +45,12 @@ class AssetReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ["-created_at"]
     search_fields = ["name"]
 
+    def retrieve(self, request, *args, **kwargs):
+        data = get_or_build(
+            asset_scope(kwargs["pk"]), "read",
+            lambda: self.get_serializer(self.get_object()).data)
+        return Response(data)
+
 class AssetViewSet(viewsets.ModelViewSet):
     queryset = Asset.objects.all()
     serializer_class = AssetSerializer
@@ -51,11 +71,12 @@ class AssetViewSet(viewsets.ModelViewSet):
         if getattr(self, "swagger_fake_view", False):
             return Asset.objects.none()
         user = self.request.user
+        queryset = Asset.objects.prefetch_related("media__variants")
         if user.is_staff or user.is_superuser:
-            return Asset.objects.all()
+            return queryset
         if hasattr(user, 'appraiser_profile'):
-            return Asset.objects.filter(appraiser=user.appraiser_profile)
-        return Asset.objects.filter(seller=user)
+            return queryset.filter(appraiser=user.appraiser_profile)
+        return queryset.filter(seller=user)
 
     def create(self, request, *args, **kwargs):
         user = self.request.user
@@ -67,6 +88,21 @@ class AssetViewSet(viewsets.ModelViewSet):
         return Response({"message": "Asset created successfull", "asset": serializer.data}, status=status.HTTP_201_CREATED, headers=headers)
     def perform_create(self, serializer):
         return serializer.save(seller=self.request.user)
+
+    @action(detail=False, methods=["post"], url_path="bulk-intake", parser_classes=[MultiPartParser])
+    def bulk_intake(self, request):
+        """Create many assets from a CSV or JSONL ``manifest`` and an optional ``media`` zip."""
+        manifest = request.FILES.get("manifest")
+        if manifest is None:
+            raise ValidationError("A manifest file is required.")
+        manifest_type = request.data.get("format") or manifest_format(manifest.name)
+        if manifest_type not in ("csv", "jsonl"):
+            raise ValidationError("The manifest must be a .csv or .jsonl file.")
+        try:
+            report = import_assets(manifest, manifest_type, request.user, request.FILES.get("media"))
+        except (zipfile.BadZipFile, UnicodeDecodeError, csv.Error) as e:
+            raise ValidationError(f"Could not read the upload: {e}")
+        return Response(report, status=status.HTTP_200_OK)
     
     @action(
         detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated], url_path="register-for-auction"
@@ -82,29 +118,19 @@ class AssetViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        appraiser = Appraiser.objects.filter(
-            status=AppraiserStatus.ACTIVE).first()
-
-        if not appraiser:
+        if asset.appraiser or not appraisal_queue.enqueue(asset):
             return Response(
-                {"error": "No inactive appraiser available."},
+                {"error": "This asset is already queued for or under appraisal."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if asset.appraiser:
+        appraiser = appraisal_queue.assign(asset)
+        if not appraiser:
             return Response(
-                {"error": "This asset already has an appraiser assigned.",
-                    "appraiser": AppraiserSerializer(appraiser).data},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"message": "Asset registered for auction and queued for appraisal."},
+                status=status.HTTP_200_OK,
             )
 
-        asset.appraise_status = AssetAppraisalStatus.UNDER_APPRAISAL
-        asset.appraiser = appraiser
-        asset.save()
-
-        appraiser.status = AppraiserStatus.INACTIVE
-        appraiser.save()
-
         return Response(
             {"message": "Asset registered for auction and appraiser assigned.",
                 "appraiser": AppraiserSerializer(appraiser).data},
@@ -150,6 +176,28 @@ class AssetViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[permissions.IsAuthenticated],
+        serializer_class=AppraisalBatchSerializer, url_path="complete-appraisals"
+    )
+    def complete_appraisals(self, request):
+        """Record many appraisal results, each successful (with a value) or failed, in one call."""
+        serializer = AppraisalBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        assets = appraisal_queue.complete_appraisals(request.user, serializer.validated_data["results"])
+        return Response(
+            {
+                "message": f"{len(assets)} appraisals completed.",
+                "assets": [
+                    {"id": asset.id, "appraise_status": asset.appraise_status, "appraised_value": asset.appraised_value}
+                    for asset in assets
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
     @action(
         detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated], url_path="complete-appraisal-successful"
     )
@@ -169,13 +217,13 @@ class AssetViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        was_under_appraisal = asset.appraise_status == AssetAppraisalStatus.UNDER_APPRAISAL
         asset.appraise_status = AssetAppraisalStatus.APPRAISAL_SUCCESSFUL
         asset.appraisal_at = timezone.now()
         asset.save()
 
-        appraiser = request.user.appraiser_profile
-        appraiser.status = AppraiserStatus.ACTIVE
-        appraiser.save()
+        if was_under_appraisal:
+            appraisal_queue.release(current_appraiser.pk)
 
         return Response(
             {"message": "Appraisal completed successfully."},
@@ -199,14 +247,14 @@ class AssetViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        was_under_appraisal = asset.appraise_status == AssetAppraisalStatus.UNDER_APPRAISAL
         asset.appraise_status = AssetAppraisalStatus.APPRAISAL_FAILED
         asset.appraised_value = None
         asset.appraisal_at = timezone.now()
         asset.save()
 
-        appraiser = request.user.appraiser_profile
-        appraiser.status = AppraiserStatus.ACTIVE
-        appraiser.save()
+        if was_under_appraisal:
+            appraisal_queue.release(asset.appraiser_id)
 
         return Response(
             {"message": "Appraisal marked as failed."},
@@ -239,13 +287,14 @@ class AppraiserViewSet(viewsets.ModelViewSet):
         serializer_class=AssetSerializer, url_path="current-asset-assignment"
     )
     def current_asset_assignment(self, request):
-        if not Appraiser.objects.filter(user=request.user).exists():
+        appraiser_id = Appraiser.objects.filter(user=request.user).values_list("pk", flat=True).first()
+        if appraiser_id is None:
             return Response({"error": "You must be the appraiser to see asset assignment."}, status=status.HTTP_403_FORBIDDEN)
 
         current_asset = Asset.objects.filter(
-            appraiser=request.user.appraiser_profile,
+            appraiser_id=appraiser_id,
             appraise_status=AssetAppraisalStatus.UNDER_APPRAISAL,
-        ).first()
+        ).prefetch_related("media__variants").order_by("appraisal_queued_at", "pk").first()
 
         if current_asset:
             serializer = AssetSerializer(current_asset)
@@ -256,6 +305,43 @@ class AppraiserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_200_OK,
             )
 
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[permissions.IsAuthenticated],
+        serializer_class=AssetSerializer, url_path="claim-assets"
+    )
+    def claim_assets(self, request):
+        """Take queued assets up to the appraiser's free capacity."""
+        appraiser = Appraiser.objects.filter(user=request.user).first()
+        if appraiser is None:
+            return Response({"error": "You must be the appraiser to claim assets."}, status=status.HTTP_403_FORBIDDEN)
+
+        claimed = appraisal_queue.claim(appraiser)
+        return Response(AssetSerializer(claimed, many=True, context=self.get_serializer_context()).data)
+
+
+def check_can_add_media(user, asset, media_type):
+    if not Asset.objects.filter(id=asset.id).exists():
+        raise ValidationError("The asset does not exist.")
+
+    if (
+        asset.seller != user
+        and not user.is_staff
+        and not user.is_superuser
+    ):
+        raise PermissionDenied(
+            "You do not have permission to add media to this asset."
+        )
+
+    if asset.appraise_status != AssetAppraisalStatus.NOT_APPRAISED:
+        if not user.is_staff and not user.is_superuser:
+            raise PermissionDenied(
+                "You do not have permission to add media to an asset that is not yet appraised."
+            )
+
+    check_media_slot(asset, media_type)
+
 
 class AssetMediaViewSet(viewsets.ModelViewSet):
     queryset = AssetMedia.objects.all()
@@ -270,46 +356,106 @@ class AssetMediaViewSet(viewsets.ModelViewSet):
         if getattr(self, "swagger_fake_view", False):
             return AssetMedia.objects.none()
         user = self.request.user
+        queryset = AssetMedia.objects.select_related("asset").prefetch_related("variants")
         if user.is_staff or user.is_superuser:
-            return AssetMedia.objects.all()
-        return AssetMedia.objects.filter(asset__seller=user)
+            return queryset
+        if self.action == "content":
+            # AssetMediaPermission decides, so outsiders get a 403 like on the assets themselves.
+            return queryset
+        return queryset.filter(asset__seller=user)
     
     def perform_create(self, serializer):
-        asset = serializer.validated_data.get("asset")
-        if not Asset.objects.filter(id=asset.id).exists():
-            raise ValidationError("The asset does not exist.")
-        
-        if (
-            asset.seller != self.request.user
-            and not self.request.user.is_staff
-            and not self.request.user.is_superuser
-        ):
-            raise PermissionDenied(
-                "You do not have permission to add media to this asset."
-            )
-        
-        if asset.appraise_status != AssetAppraisalStatus.NOT_APPRAISED:
-            if not self.request.user.is_staff and not self.request.user.is_superuser:
-                raise PermissionDenied(
-                    "You do not have permission to add media to an asset that is not yet appraised."
-                )
-
-        media_type = serializer.validated_data.get("media_type")
-        
-        existing_media_count = AssetMedia.objects.filter(
-            asset=asset,
-            media_type=media_type
-        ).count()
-
-        if media_type == AssetMediaType.IMAGE:
-            if existing_media_count > 20:
-                raise ValidationError("This asset already has the maximum number of images (20).")
-        elif media_type == AssetMediaType.VIDEO:
-            if existing_media_count > 10:
-                raise ValidationError("This asset already has the maximum number of videos (10).")
-        elif media_type == AssetMediaType.DOCUMENT:
-            pass
-        else:
-            raise ValidationError(f"Invalid media type: {media_type}")
+        check_can_add_media(
+            self.request.user,
+            serializer.validated_data.get("asset"),
+            serializer.validated_data.get("media_type"),
+        )
+        with transaction.atomic():
+            reserve_media_slot(serializer.validated_data["asset"].id, serializer.validated_data["media_type"])
+            media = serializer.save()
+            schedule_media_processing(media)
+
+    def perform_update(self, serializer):
+        media = serializer.instance
+        old_media_type = media.media_type
+        with transaction.atomic():
+            new_media_type = serializer.validated_data.get("media_type", old_media_type)
+            if new_media_type != old_media_type:
+                reserve_media_slot(media.asset_id, new_media_type)
+                release_media_slot(media.asset_id, old_media_type)
+            media = serializer.save()
+            if "file" in serializer.validated_data:
+                schedule_media_processing(media)
+
+    @action(detail=True, methods=["get"], url_path="content")
+    def content(self, request, pk=None):
+        """The media file, or the ``variant`` named in the query, with Range and conditional request support."""
+        media = self.get_object()
+        variant = None
+        if request.query_params.get("variant"):
+            variant = next((v for v in media.variants.all() if v.name == request.query_params["variant"]), None)
+            if variant is None:
+                raise NotFound("No such variant.")
+        return serve_media(request, media, variant)
+
+
+class AssetMediaUploadViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Resumable chunked media uploads.
+
+    Create a session, PUT raw chunks to ``chunk/`` with ``Upload-Offset`` and
+    ``Chunk-Checksum`` (SHA-256 hex) headers, then POST ``complete/``. GET the
+    session to find the offset to resume from; DELETE aborts it.
+    """
+
+    serializer_class = AssetMediaUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return AssetMediaUpload.objects.none()
+        return AssetMediaUpload.objects.filter(created_by=self.request.user)
+
+    def perform_create(self, serializer):
+        check_can_add_media(
+            self.request.user,
+            serializer.validated_data["asset"],
+            serializer.validated_data["media_type"],
+        )
+        upload = serializer.save(created_by=self.request.user)
+        start_upload(upload)
+
+    def perform_destroy(self, instance):
+        abort_upload(instance)
 
-        serializer.save()
+    @action(detail=True, methods=["put"])
+    def chunk(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            raise ValidationError("Upload-Offset and Content-Length headers are required.")
+        digest = request.headers.get("Chunk-Checksum")
+        if not digest:
+            raise ValidationError("A Chunk-Checksum header is required.")
+
+        # Read the raw body stream; request.data would buffer the chunk.
+        write_chunk(upload, request.stream, offset, length, digest)
+        return Response(self.get_serializer(upload).data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        upload = self.get_object()
+        media = complete_upload(upload, request.data.get("checksum"))
+        return Response(
+            {
+                "upload": self.get_serializer(upload).data,
+                "media": AssetMediaSerializer(media, context=self.get_serializer_context()).data,
+            },
+            status=status.HTTP_201_CREATED,
+        )
@@ -0,0 +1,130 @@
+import time
+import uuid
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from .models import BidEvent
+from .caching import invalidate, auction_assets_scope, asset_scope
+from .bid_stats import record_bid_events
+from .notifications import schedule_outbid_notifications
+from auctions import constants
+
+
+def _latest_sequence_key(auction_asset_id):
+    return f"bid_log:auction_asset:{auction_asset_id}:sequence"
+
+
+def _outcome_key(ticket):
+    return f"bid_log:outcome:{ticket}"
+
+
+def append_bid_events(sequenced_bids):
+    """Append log entries for saved ``(bid, sequence)`` pairs."""
+    events = [
+        BidEvent(
+            auction_asset_id=bid.auction_asset_id,
+            sequence=sequence,
+            bid_id=bid.id,
+            user_id=bid.user_id,
+            amount=bid.amount,
+            created_at=bid.created_at,
+        )
+        for bid, sequence in sequenced_bids
+    ]
+    BidEvent.objects.bulk_create(events)
+    return events
+
+
+def publish_bid_events(auction_asset, events):
+    """Run the side effects of committed bids on one auction asset.
+
+    ``auction_asset`` only needs ``auction_id`` and ``asset_id`` attributes.
+    """
+    invalidate(auction_assets_scope(auction_asset.auction_id), asset_scope(auction_asset.asset_id))
+    if events:
+        cache.set(_latest_sequence_key(events[-1].auction_asset_id), events[-1].sequence, constants.AUCTION_CACHE_TIMEOUT)
+        record_bid_events(events[-1].auction_asset_id, events)
+        schedule_outbid_notifications(events[-1].auction_asset_id)
+
+
+def parse_cursor(cursor):
+    """Parse an ``auction_asset:sequence,...`` cursor into a dict."""
+    positions = {}
+    for part in filter(None, (cursor or '').split(',')):
+        auction_asset_id, _, sequence = part.partition(':')
+        positions[int(auction_asset_id)] = int(sequence)
+    return positions
+
+
+def format_cursor(positions):
+    return ','.join(f"{auction_asset_id}:{sequence}" for auction_asset_id, sequence in sorted(positions.items()))
+
+
+def events_since(positions, limit=constants.BID_FEED_PAGE_SIZE):
+    """Return the events after each ``{auction_asset_id: sequence}`` position."""
+    if not positions:
+        return []
+    condition = reduce(or_, (
+        Q(auction_asset_id=auction_asset_id, sequence__gt=sequence)
+        for auction_asset_id, sequence in positions.items()
+    ))
+    return list(BidEvent.objects.filter(condition).order_by('created_at', 'auction_asset_id', 'sequence')[:limit])
+
+
+def _has_newer_events(positions):
+    latest = cache.get_many([_latest_sequence_key(auction_asset_id) for auction_asset_id in positions])
+    return any(
+        latest.get(_latest_sequence_key(auction_asset_id), 0) > sequence
+        for auction_asset_id, sequence in positions.items()
+    )
+
+
+def wait_for_events(positions, wait=0):
+    """Like ``events_since``, optionally long-polling up to ``wait`` seconds.
+
+    While waiting only the cached latest sequences are polled; the log is
+    queried again once one of them moves past the cursor.
+    """
+    events = events_since(positions)
+    deadline = time.monotonic() + wait
+    while not events and time.monotonic() < deadline:
+        time.sleep(constants.BID_FEED_POLL_INTERVAL)
+        if _has_newer_events(positions):
+            events = events_since(positions)
+    return events
+
+
+def advance_cursor(positions, events):
+    positions = dict(positions)
+    for event in events:
+        positions[event.auction_asset_id] = max(positions.get(event.auction_asset_id, 0), event.sequence)
+    return positions
+
+
+def latest_sequence(auction_asset_id):
+    sequence = cache.get(_latest_sequence_key(auction_asset_id))
+    if sequence is None:
+        sequence = BidEvent.objects.filter(auction_asset_id=auction_asset_id).aggregate(
+            latest=Max('sequence'))['latest'] or 0
+    return sequence
+
+
+def new_bid_ticket():
+    return uuid.uuid4().hex
+
+
+def publish_bid_outcomes(outcomes):
+    """Publish ``{ticket: outcome}`` for bids acknowledged before they were committed."""
+    if outcomes:
+        cache.set_many(
+            {_outcome_key(ticket): outcome for ticket, outcome in outcomes.items()},
+            constants.BID_OUTCOME_TIMEOUT)
+
+
+def get_bid_outcome(ticket):
+    if not ticket:
+        return None
+    return cache.get(_outcome_key(ticket))
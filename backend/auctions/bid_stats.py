@@ -0,0 +1,126 @@
+"""Incrementally maintained per-lot leaderboard and price history.
+
+Both live in one cache entry per AuctionAsset, updated from committed bid
+events. Every read-modify-write of an entry holds the lot's cache lock, so
+concurrent publishers cannot overwrite each other's events. Merges are
+order-independent and idempotent; when an update finds a gap in the
+sequence (events published before the entry was built), the entry is
+rebuilt from the bid event log instead.
+"""
+from django.core.cache import cache
+from django.db.models import Max
+
+from american_auction.locking import LockUnavailable, cache_lock
+from .models import BidEvent
+from auctions import constants
+
+
+def _stats_key(auction_asset_id):
+    return f"bid_stats:auction_asset:{auction_asset_id}"
+
+
+def _lock_key(auction_asset_id):
+    return f"bid_stats:auction_asset:{auction_asset_id}:lock"
+
+
+def _bucket(created_at):
+    return int(created_at.timestamp() // constants.PRICE_SERIES_BUCKET_SECONDS)
+
+
+def _merge(stats, events):
+    leaders = {entry['user']: entry for entry in stats['leaders']}
+    for event in events:
+        entry = leaders.get(event.user_id)
+        if entry is None or entry['amount'] < event.amount:
+            leaders[event.user_id] = {
+                'user': event.user_id, 'amount': event.amount,
+                'sequence': event.sequence, 'created_at': event.created_at,
+            }
+        bucket = _bucket(event.created_at)
+        stats['buckets'][bucket] = max(stats['buckets'].get(bucket, event.amount), event.amount)
+        stats['watermark'] = max(stats['watermark'], event.sequence)
+    stats['leaders'] = sorted(leaders.values(), key=lambda entry: entry['amount'], reverse=True)[:constants.LEADERBOARD_SIZE]
+    return stats
+
+
+def _rebuild(auction_asset_id):
+    events = BidEvent.objects.filter(auction_asset_id=auction_asset_id)
+    stats = {'watermark': 0, 'leaders': [], 'buckets': {}}
+
+    leaders = events.values('user_id').annotate(
+        amount=Max('amount'), sequence=Max('sequence'), created_at=Max('created_at')
+    ).order_by('-amount')[:constants.LEADERBOARD_SIZE]
+    stats['leaders'] = [
+        {'user': row['user_id'], 'amount': row['amount'], 'sequence': row['sequence'], 'created_at': row['created_at']}
+        for row in leaders
+    ]
+    for sequence, amount, created_at in events.values_list('sequence', 'amount', 'created_at').iterator():
+        bucket = _bucket(created_at)
+        stats['buckets'][bucket] = max(stats['buckets'].get(bucket, amount), amount)
+        stats['watermark'] = max(stats['watermark'], sequence)
+    return stats
+
+
+def get_bid_stats(auction_asset_id):
+    key = _stats_key(auction_asset_id)
+    stats = cache.get(key)
+    if stats is None:
+        try:
+            # Built under the lock, so an update published meanwhile waits
+            # and is merged into this entry instead of being missed by it.
+            with cache_lock(_lock_key(auction_asset_id), constants.BID_STATS_LOCK_TIMEOUT):
+                stats = _rebuild(auction_asset_id)
+                cache.set(key, stats, constants.AUCTION_CACHE_TIMEOUT)
+        except LockUnavailable:
+            stats = _rebuild(auction_asset_id)
+    return stats
+
+
+def record_bid_events(auction_asset_id, events):
+    """Fold committed events (ordered by sequence) into the lot's stats."""
+    key = _stats_key(auction_asset_id)
+    try:
+        with cache_lock(_lock_key(auction_asset_id), constants.BID_STATS_LOCK_TIMEOUT,
+                        wait=constants.BID_STATS_LOCK_WAIT):
+            stats = cache.get(key)
+            if stats is None:
+                return
+            if events[0].sequence > stats['watermark'] + 1:
+                stats = _rebuild(auction_asset_id)
+            else:
+                stats = _merge(stats, events)
+            cache.set(key, stats, constants.AUCTION_CACHE_TIMEOUT)
+    except LockUnavailable:
+        # The entry would miss these events; the next read rebuilds it.
+        cache.delete(key)
+
+
+def invalidate_bid_stats(auction_asset_id):
+    """Drop the lot's entry, e.g. after its bids were rewritten; the next read rebuilds it."""
+    cache.delete(_stats_key(auction_asset_id))
+
+
+def leaderboard(auction_asset_id, size=constants.LEADERBOARD_SIZE):
+    return get_bid_stats(auction_asset_id)['leaders'][:size]
+
+
+def price_series(auction_asset, points, start, end):
+    """Downsample the lot's price history to ``points`` samples over [start, end].
+
+    Each sample is the price in force at the end of its interval. The work is
+    proportional to the number of stored buckets and points, not bids.
+    """
+    buckets = sorted(get_bid_stats(auction_asset.id)['buckets'].items())
+    step = (end - start) / points
+
+    series = []
+    price = auction_asset.starting_price
+    position = 0
+    for i in range(1, points + 1):
+        at = start + step * i
+        limit = _bucket(at)
+        while position < len(buckets) and buckets[position][0] <= limit:
+            price = max(price, buckets[position][1])
+            position += 1
+        series.append({'at': at, 'price': price})
+    return series
@@ -0,0 +1,71 @@
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from auctions import constants
+
+
+def _generation_key(scope):
+    return f"{scope}:generation"
+
+
+def _generation(scope):
+    key = _generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed with a timestamp so a re-created counter never reuses old entries.
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate(*scopes):
+    """Make every entry cached under the given scopes stale at once."""
+    for scope in scopes:
+        try:
+            cache.incr(_generation_key(scope))
+        except ValueError:
+            cache.add(_generation_key(scope), time.time_ns(), None)
+
+
+def auction_scope(auction_id):
+    return f"auction:{auction_id}"
+
+
+def auction_assets_scope(auction_id):
+    return f"auction:{auction_id}:assets"
+
+
+def asset_scope(asset_id):
+    return f"asset:{asset_id}"
+
+
+def dashboard_scope(user_id):
+    return f"user:{user_id}:dashboard"
+
+
+def cache_key(scope, name):
+    return f"{scope}:{_generation(scope)}:{name}"
+
+
+def _set(key, data, timeout):
+    # Data read inside a transaction (e.g. an atomic batch) may be rolled
+    # back, so it is only cached once committed.
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: cache.set(key, data, timeout))
+    else:
+        cache.set(key, data, timeout)
+
+
+def get_or_build(scope, name, build, timeout=constants.AUCTION_CACHE_TIMEOUT):
+    key = cache_key(scope, name)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        _set(key, data, timeout)
+    return data
+
+
+def store(scope, name, data, timeout=constants.AUCTION_CACHE_TIMEOUT):
+    _set(cache_key(scope, name), data, timeout)
@@ -0,0 +1,44 @@
+"""Optimistic concurrency for rows with a ``version`` column.
+
+Writers update only the columns they change and compare-and-set on the version
+they read, so conflicting requests fail fast with a 409 instead of waiting on
+row locks or overwriting each other's changes.
+"""
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This record was changed by another request, reload it and retry."
+    default_code = 'version_conflict'
+
+
+def versioned_update(instance, **changes):
+    """Write ``changes`` to ``instance`` if its row still has the loaded version.
+
+    Only the changed columns (plus ``version`` and ``updated_at``) are written.
+    On success the instance is updated in place; otherwise VersionConflict is
+    raised and nothing is written.
+    """
+    changes.setdefault('updated_at', timezone.now())
+    updated = type(instance).objects.filter(pk=instance.pk, version=instance.version).update(
+        version=F('version') + 1, **changes)
+    if not updated:
+        raise VersionConflict()
+    for field, value in changes.items():
+        setattr(instance, field, value)
+    instance.version += 1
+    return instance
+
+
+def bump_version(queryset, **changes):
+    """Apply ``changes`` to every row of ``queryset`` and advance their versions.
+
+    For set-wise writers whose own filter already guards the change (for
+    example only moving UNPAID rows to PAID); returns the number of rows.
+    """
+    changes.setdefault('updated_at', timezone.now())
+    return queryset.update(version=F('version') + 1, **changes)
@@ -32,3 +32,48 @@ DEPOSIT_PERCENTAGES  = {
     'technology_electronics_engineering': 10,  
     'others': 15,
 }
+
+PAYMENT_REFERENCE_PREFIXES = {
+    'REG': 'registration',
+    'DEP': 'deposit',
+    'CTW': 'contract_winner',
+    'CTS': 'contract_seller',
+}
+
+RECONCILIATION_CHUNK_SIZE = 1000
+RECONCILIATION_MAX_REPORTED_ERRORS = 1000
+
+ELIGIBILITY_INDEX_TIMEOUT = 24 * 60 * 60  # 1 day
+AUCTION_CACHE_TIMEOUT = 6 * 60 * 60  # 6 hours
+
+BID_FEED_PAGE_SIZE = 500
+BID_FEED_MAX_WAIT = 25  # seconds
+BID_FEED_POLL_INTERVAL = 0.2  # seconds
+BID_OUTCOME_TIMEOUT = 60 * 60  # 1 hour
+
+LEADERBOARD_SIZE = 10
+BID_STATS_LOCK_TIMEOUT = 10  # seconds a bid stats update may hold the lot's lock
+BID_STATS_LOCK_WAIT = 2  # seconds an update waits for the lock before dropping the entry
+PRICE_SERIES_BUCKET_SECONDS = 5
+PRICE_SERIES_DEFAULT_POINTS = 100
+PRICE_SERIES_MAX_POINTS = 1000
+
+FINALIZE_MAX_ATTEMPTS = 3
+
+REPLAY_CHUNK_SIZE = 5000  # bid events streamed, and backfilled, per query
+
+DASHBOARD_CACHE_TIMEOUT = 30  # seconds; other bidders' activity is not invalidated
+
+NOTIFICATION_COALESCE_WINDOW = 30  # seconds; outbids of one lot within it are sent together
+NOTIFICATION_BATCH_SIZE = 500
+
+# Price histograms use log-spaced buckets, so percentiles are within ~5%.
+VALUATION_PRICE_BUCKET_BASE = 1.05
+VALUATION_RATIO_BUCKET_WIDTH = 0.05
+VALUATION_RATIO_MAX_BUCKET = 200  # ratios of 10 and above share the last bucket
+VALUATION_PERCENTILES = (10, 25, 50, 75, 90)
+VALUATION_MIN_SAMPLES = 10  # an origin needs this many sales to be preferred over its category
+VALUATION_COMPARABLES = 5  # recent sales returned per asset
+VALUATION_COMPARABLES_DAYS = 365
+VALUATION_BATCH_MAX_SIZE = 200
+VALUATION_REBUILD_CHUNK_SIZE = 2000
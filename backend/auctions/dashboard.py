@@ -0,0 +1,103 @@
+"""A bidder's activity across auctions, assembled in a fixed number of queries."""
+from django.db.models import Count, Max, Q
+
+from .models import Auction, RegistrationFee, AssetDeposit, Bid, Contract
+from .caching import get_or_build, invalidate, dashboard_scope
+from auctions import constants
+
+
+def _lot_status(my_highest, current_price, final_price):
+    if final_price is not None:
+        return 'won' if my_highest == final_price else 'lost'
+    return 'leading' if my_highest >= current_price else 'outbid'
+
+
+def build_dashboard(user):
+    """Group the user's registrations, deposits, bids and contracts per auction.
+
+    Runs five queries regardless of how many auctions or lots are involved.
+    """
+    auctions = {}
+
+    def entry(auction_id):
+        if auction_id not in auctions:
+            auctions[auction_id] = {'registration': None, 'lots': {}, 'contracts': []}
+        return auctions[auction_id]
+
+    def lot(auction_id, auction_asset_id, asset_name):
+        lots = entry(auction_id)['lots']
+        if auction_asset_id not in lots:
+            lots[auction_asset_id] = {
+                'auction_asset': auction_asset_id, 'asset_name': asset_name, 'deposit': None, 'bidding': None,
+            }
+        return lots[auction_asset_id]
+
+    registrations = RegistrationFee.objects.filter(user=user).values(
+        'id', 'auction_id', 'amount', 'registration_payment_status')
+    for row in registrations:
+        entry(row['auction_id'])['registration'] = {
+            'id': row['id'],
+            'amount': row['amount'],
+            'payment_status': row['registration_payment_status'],
+            'payment_reference': f"REG-{row['id']}",
+        }
+
+    deposits = AssetDeposit.objects.filter(user=user).values(
+        'id', 'auction_asset_id', 'auction_asset__auction_id', 'auction_asset__asset__name',
+        'amount', 'deposit_payment_status')
+    for row in deposits:
+        lot(row['auction_asset__auction_id'], row['auction_asset_id'], row['auction_asset__asset__name'])['deposit'] = {
+            'id': row['id'],
+            'amount': row['amount'],
+            'payment_status': row['deposit_payment_status'],
+            'payment_reference': f"DEP-{row['id']}",
+        }
+
+    bids = Bid.objects.filter(user=user).values(
+        'auction_asset_id', 'auction_asset__auction_id', 'auction_asset__asset__name',
+        'auction_asset__current_price', 'auction_asset__final_price',
+    ).annotate(my_highest=Max('amount'), my_bids=Count('id')).order_by()
+    for row in bids:
+        lot(row['auction_asset__auction_id'], row['auction_asset_id'], row['auction_asset__asset__name'])['bidding'] = {
+            'my_highest': row['my_highest'],
+            'my_bids': row['my_bids'],
+            'current_price': row['auction_asset__current_price'],
+            'status': _lot_status(row['my_highest'], row['auction_asset__current_price'], row['auction_asset__final_price']),
+        }
+
+    contracts = Contract.objects.filter(Q(winner=user) | Q(seller=user)).values(
+        'id', 'auction_asset_id', 'auction_asset__auction_id', 'winner_id', 'status',
+        'winner_payment_status', 'seller_payment_status', 'winner_amount_due', 'seller_amount_due', 'payment_due_date')
+    for row in contracts:
+        is_winner = row['winner_id'] == user.id
+        entry(row['auction_asset__auction_id'])['contracts'].append({
+            'id': row['id'],
+            'auction_asset': row['auction_asset_id'],
+            'role': 'winner' if is_winner else 'seller',
+            'status': row['status'],
+            'payment_status': row['winner_payment_status'] if is_winner else row['seller_payment_status'],
+            'amount_due': row['winner_amount_due'] if is_winner else row['seller_amount_due'],
+            'payment_due_date': row['payment_due_date'],
+            'payment_reference': f"{'CTW' if is_winner else 'CTS'}-{row['id']}",
+        })
+
+    details = Auction.objects.filter(id__in=auctions.keys()).values('id', 'name', 'status', 'start_at', 'end_at')
+    result = []
+    for auction in sorted(details, key=lambda auction: auction['start_at'], reverse=True):
+        activity = auctions[auction['id']]
+        result.append({
+            'auction': auction,
+            'registration': activity['registration'],
+            'lots': list(activity['lots'].values()),
+            'contracts': activity['contracts'],
+        })
+    return result
+
+
+def get_dashboard(user):
+    return get_or_build(dashboard_scope(user.id), 'dashboard', lambda: build_dashboard(user),
+                        constants.DASHBOARD_CACHE_TIMEOUT)
+
+
+def invalidate_dashboard(*user_ids):
+    invalidate(*(dashboard_scope(user_id) for user_id in user_ids if user_id))
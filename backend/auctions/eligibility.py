@@ -0,0 +1,56 @@
+from django.core.cache import cache
+
+from .models import AssetDeposit
+from .enums import PaymentStatus
+from auctions import constants
+
+
+def _auction_asset_key(auction_asset_id):
+    return f"eligibility:auction_asset:{auction_asset_id}"
+
+
+def _bidder_key(auction_asset_id, user_id):
+    return f"eligibility:auction_asset:{auction_asset_id}:user:{user_id}"
+
+
+def build_eligibility_index(auction):
+    """Index the auction status and every paid depositor of the auction's assets."""
+    entries = {
+        _auction_asset_key(auction_asset_id): auction.status
+        for auction_asset_id in auction.auction_assets.values_list('id', flat=True)
+    }
+    paid_deposits = AssetDeposit.objects.filter(
+        auction_asset__auction=auction,
+        deposit_payment_status=PaymentStatus.PAID,
+    ).values_list('auction_asset_id', 'user_id')
+    for auction_asset_id, user_id in paid_deposits.iterator():
+        entries[_bidder_key(auction_asset_id, user_id)] = True
+    cache.set_many(entries, constants.ELIGIBILITY_INDEX_TIMEOUT)
+    return len(entries)
+
+
+def clear_eligibility_index(auction):
+    cache.delete_many([
+        _auction_asset_key(auction_asset_id)
+        for auction_asset_id in auction.auction_assets.values_list('id', flat=True)
+    ])
+
+
+def add_eligible_bidders(pairs):
+    """Mark ``(auction_asset_id, user_id)`` pairs as having a paid deposit."""
+    entries = {_bidder_key(auction_asset_id, user_id): True for auction_asset_id, user_id in pairs}
+    if entries:
+        cache.set_many(entries, constants.ELIGIBILITY_INDEX_TIMEOUT)
+
+
+def lookup_bid_eligibility(auction_asset_id, user_id):
+    """Return ``(auction_status, has_paid_deposit)`` from the index.
+
+    The status is None when the auction asset is not indexed. A missing bidder
+    entry is not authoritative (the entry may have been evicted), so callers
+    should confirm negative answers against the database.
+    """
+    asset_key = _auction_asset_key(auction_asset_id)
+    bidder_key = _bidder_key(auction_asset_id, user_id)
+    values = cache.get_many([asset_key, bidder_key])
+    return values.get(asset_key), bidder_key in values
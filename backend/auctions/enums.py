@@ -27,4 +27,19 @@ class FeeType(models.TextChoices):
     LISTING = 'listing', 'Listing Fee'
     INSURANCE = 'insurance', 'Insurance Fee'
     SHIPPING = 'shipping', 'Shipping Fee'
-    OTHER = 'other', 'Other Service Fee'
\ No newline at end of file
+    OTHER = 'other', 'Other Service Fee'
+
+
+class NotificationKind(models.TextChoices):
+    OUTBID = 'outbid', 'Outbid'
+    AUCTION_UPCOMING = 'auction_upcoming', 'Auction upcoming'
+    AUCTION_STARTED = 'auction_started', 'Auction started'
+    AUCTION_FINISHED = 'auction_finished', 'Auction finished'
+
+class ValuationDimension(models.TextChoices):
+    CATEGORY = 'category', 'Category'
+    ORIGIN = 'origin', 'Origin'
+
+class ValuationMetric(models.TextChoices):
+    PRICE = 'price', 'Hammer price'
+    RATIO = 'ratio', 'Hammer to appraised ratio'
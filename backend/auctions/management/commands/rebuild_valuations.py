@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from auctions.valuation import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the comparable-sales valuation statistics from all settled auction assets."
+
+    def handle(self, *args, **options):
+        sales = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt valuation statistics from {sales} sales"))
@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.reconciliation import detect_format, reconcile_statement
+
+
+class Command(BaseCommand):
+    help = "Reconcile a CSV or JSONL bank statement against registration fees, deposits and contracts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help="Path to the bank statement file.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Statement format, detected from the file extension by default.")
+        parser.add_argument('--chunk-size', type=int, default=None, help="Number of statement lines applied per transaction.")
+
+    def handle(self, *args, **options):
+        path = options['statement']
+        try:
+            fmt = options['format'] or detect_format(path)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        kwargs = {}
+        if options['chunk_size']:
+            kwargs['chunk_size'] = options['chunk_size']
+
+        try:
+            with open(path, 'rb') as statement:
+                report = reconcile_statement(statement, fmt, **kwargs)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(json.dumps(report.as_dict(), indent=2, default=str))
@@ -0,0 +1,49 @@
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.models import AuctionAsset
+from auctions.replay import apply_replayed_state, backfill_bid_log, replay_bid_log
+
+
+class Command(BaseCommand):
+    help = "Rebuild AuctionAsset price state from the bid event log and report (or fix) mismatches."
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--auction-asset', type=int, help="Replay a single auction asset.")
+        target.add_argument('--auction', type=int, help="Replay every asset of an auction.")
+        target.add_argument('--date', type=date.fromisoformat, help="Replay every asset auctioned on this day (YYYY-MM-DD).")
+        parser.add_argument('--backfill', action='store_true', help="Seed the log from existing bids where it is empty.")
+        parser.add_argument('--fix', action='store_true', help="Write the replayed state back to the database.")
+
+    def handle(self, *args, **options):
+        if options['auction_asset']:
+            auction_assets = AuctionAsset.objects.filter(pk=options['auction_asset'])
+        elif options['auction']:
+            auction_assets = AuctionAsset.objects.filter(auction_id=options['auction'])
+        else:
+            auction_assets = AuctionAsset.objects.filter(auction__start_at__date=options['date'])
+
+        if not auction_assets.exists():
+            raise CommandError("No auction assets match the given target.")
+
+        if options['backfill']:
+            created = backfill_bid_log(auction_assets)
+            self.stdout.write(f"Backfilled {created} bid events")
+
+        started = time.monotonic()
+        mismatches = replay_bid_log(auction_assets)
+        elapsed = time.monotonic() - started
+
+        for lot in mismatches:
+            self.stdout.write(json.dumps(lot.as_dict(), default=str))
+
+        if mismatches and options['fix']:
+            apply_replayed_state(mismatches)
+            self.stdout.write(self.style.WARNING(f"Fixed {len(mismatches)} auction assets"))
+
+        style = self.style.WARNING if mismatches else self.style.SUCCESS
+        self.stdout.write(style(f"Replayed {auction_assets.count()} auction assets in {elapsed:.3f}s, {len(mismatches)} mismatched"))
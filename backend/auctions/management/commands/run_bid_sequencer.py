@@ -0,0 +1,49 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def _run_partition(partition):
+    import django
+    django.setup()
+
+    from auctions.sequencer import BidSequencer
+    BidSequencer(partition).serve_forever()
+
+
+class Command(BaseCommand):
+    help = "Run the single-writer bid sequencer, one process per AuctionAsset partition."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partition', type=int, help="Serve only this partition in the current process.")
+
+    def handle(self, *args, **options):
+        partitions = settings.BID_SEQUENCER['PARTITIONS']
+        partition = options['partition']
+
+        if partition is not None:
+            if not 0 <= partition < partitions:
+                raise CommandError(f"Partition must be between 0 and {partitions - 1}.")
+            self.stdout.write(f"Serving bid sequencer partition {partition}/{partitions}")
+            from auctions.sequencer import BidSequencer
+            BidSequencer(partition).serve_forever()
+            return
+
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=_run_partition, args=(i,), name=f"bid-sequencer-{i}")
+            for i in range(partitions)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {partitions} bid sequencer processes")
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.models import Auction
+from auctions.warmup import warm_up_auction
+
+
+class Command(BaseCommand):
+    help = "Preload caches for an auction and its assets ahead of bidding."
+
+    def add_arguments(self, parser):
+        parser.add_argument('auction_id', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            auction = Auction.objects.get(pk=options['auction_id'])
+        except Auction.DoesNotExist:
+            raise CommandError(f"Auction {options['auction_id']} does not exist.")
+
+        report = warm_up_auction(auction)
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed up auction {report['auction']}: {report['auction_assets']} assets, "
+            f"{report['eligibility_entries']} eligibility entries in {report['duration_ms']}ms"
+        ))
@@ -3,7 +3,10 @@ from django.db import models
 from django.utils import timezone
 from users.models import User
 from assets.models import Asset
-from .enums import AuctionStatus, FeeType, ContractStatus, PaymentStatus, TaxType
+from .enums import (
+    AuctionStatus, FeeType, ContractStatus, NotificationKind, PaymentStatus, TaxType, ValuationDimension, ValuationMetric,
+)
+from .concurrency import versioned_update
 from assets.enums import AssetCategory
 
 class Auction(models.Model):
@@ -30,6 +33,7 @@ class AuctionAsset(models.Model):
     current_price = models.DecimalField(max_digits=12, decimal_places=2)
     final_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     bid_count = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -44,11 +48,16 @@ class RegistrationFee(models.Model):
     auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='registration_fees')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     registration_payment_status = models.CharField(max_length=20, choices=PaymentStatus.choices, default=PaymentStatus.UNPAID)
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('user', 'auction')
+
+    @property
+    def payment_reference(self):
+        return f"REG-{self.pk}"
         
 class AssetDeposit(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deposits')
@@ -56,12 +65,17 @@ class AssetDeposit(models.Model):
     percentage = models.DecimalField(max_digits=5, decimal_places=2)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     deposit_payment_status = models.CharField(max_length=20, choices=PaymentStatus.choices, default=PaymentStatus.UNPAID)
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('user', 'auction_asset')
 
+    @property
+    def payment_reference(self):
+        return f"DEP-{self.pk}"
+
     def __str__(self):
         return f"Deposit for {self.auction_asset.asset.name} by {self.user}"
     
@@ -76,6 +90,27 @@ class Bid(models.Model):
     def __str__(self):
         return f"Bid of {self.amount} by {self.user} for {self.auction_asset.asset.name}"
 
+class BidEvent(models.Model):
+    """Append-only, per-AuctionAsset sequenced log of accepted bids."""
+
+    auction_asset = models.ForeignKey(AuctionAsset, on_delete=models.CASCADE, related_name='bid_events')
+    sequence = models.PositiveBigIntegerField()
+    bid_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('auction_asset', 'sequence')
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Bid events are append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Bid event #{self.sequence} for auction asset {self.auction_asset_id}"
+
 class Fee(models.Model):
     name = models.CharField(max_length=255)
     fee_type = models.CharField(max_length=50, choices=FeeType.choices)
@@ -113,26 +148,46 @@ class Contract(models.Model):
     winner_payment_status = models.CharField(max_length=20, choices=PaymentStatus.choices, default=PaymentStatus.UNPAID)
     seller_payment_status = models.CharField(max_length=20, choices=PaymentStatus.choices, default=PaymentStatus.UNPAID)
     payment_due_date = models.DateField()
-    
+    version = models.PositiveIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def update_status(self):
-        if self.winner_payment_status == PaymentStatus.PAID and self.seller_payment_status == PaymentStatus.PAID:
-            self.status = ContractStatus.COMPLETED
-        self.save()
-        
+    def mark_paid(self, status_field):
+        """Mark one side as paid, completing the contract once both sides are.
+
+        Version-checked, so a concurrent payment on the other side raises
+        VersionConflict instead of being overwritten.
+        """
+        changes = {status_field: PaymentStatus.PAID}
+        other_field = 'seller_payment_status' if status_field == 'winner_payment_status' else 'winner_payment_status'
+        if getattr(self, other_field) == PaymentStatus.PAID:
+            changes['status'] = ContractStatus.COMPLETED
+        versioned_update(self, **changes)
+
     def calculate_amounts(self):
-        self.total_fees = sum(cf.amount for cf in self.contract_fees.all())
-        self.total_taxes = sum(ct.amount for ct in self.contract_taxes.all())
-        self.winner_amount_due = self.auction_asset.final_price + self.total_taxes - self.winner.deposits.filter(auction_asset=self.auction_asset).first().amount
-        self.seller_amount_due = self.total_fees
-        self.save()
+        total_fees = sum(cf.amount for cf in self.contract_fees.all())
+        total_taxes = sum(ct.amount for ct in self.contract_taxes.all())
+        versioned_update(
+            self,
+            total_fees=total_fees,
+            total_taxes=total_taxes,
+            winner_amount_due=self.auction_asset.final_price + total_taxes - self.winner.deposits.filter(auction_asset=self.auction_asset).first().amount,
+            seller_amount_due=total_fees,
+        )
 
     @property
     def final_price(self):
         return self.auction_asset.final_price
 
+    @property
+    def winner_payment_reference(self):
+        return f"CTW-{self.pk}"
+
+    @property
+    def seller_payment_reference(self):
+        return f"CTS-{self.pk}"
+
     def __str__(self):
         return f"Contract for {self.auction_asset.asset.name}"
     
@@ -143,6 +198,9 @@ class ContractFee(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        unique_together = ('contract', 'fee')
+
     def __str__(self):
         return f"{self.fee} for {self.contract}"
 
@@ -152,6 +210,75 @@ class ContractTax(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    class Meta:
+        unique_together = ('contract', 'tax')
+
     def __str__(self):
-        return f"{self.tax} for {self.contract}"
\ No newline at end of file
+        return f"{self.tax} for {self.contract}"
+
+
+class Notification(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=NotificationKind.choices)
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    auction_asset = models.ForeignKey(AuctionAsset, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    message = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=1)
+    sequence = models.PositiveBigIntegerField(null=True, blank=True)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'updated_at']),
+            models.Index(fields=['auction_asset', 'kind', 'sequence']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} notification for {self.user}"
+
+
+class ValuationStats(models.Model):
+    """Running totals of settled sales for one category or origin; see auctions.valuation."""
+
+    dimension = models.CharField(max_length=20, choices=ValuationDimension.choices)
+    key = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    ratio_count = models.PositiveIntegerField(default=0)
+    ratio_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('dimension', 'key')
+
+
+class ValuationBucket(models.Model):
+    """One histogram bucket of ValuationStats: sales whose metric fell in ``bucket``."""
+
+    stats = models.ForeignKey(ValuationStats, on_delete=models.CASCADE, related_name='buckets')
+    metric = models.CharField(max_length=20, choices=ValuationMetric.choices)
+    bucket = models.IntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('stats', 'metric', 'bucket')
+
+
+class ComparableSale(models.Model):
+    """A settled sale, kept with the asset attributes comparables are matched on."""
+
+    auction_asset = models.OneToOneField(AuctionAsset, on_delete=models.CASCADE, related_name='comparable_sale')
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='comparable_sales')
+    category = models.CharField(max_length=100, choices=AssetCategory.choices)
+    origin = models.CharField(max_length=255)
+    final_price = models.DecimalField(max_digits=12, decimal_places=2)
+    appraised_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    sold_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'sold_at']),
+        ]
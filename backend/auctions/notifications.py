@@ -0,0 +1,151 @@
+"""Outbid and auction milestone notifications, in the inbox and by email.
+
+Outbids are coalesced: the first committed bid on a lot in a window queues a
+single task that, after the window, notifies everyone outbid since the last
+run. Repeat outbids of a user on a lot update their unread notification
+instead of adding new ones, and repeat emails are merged by the outbox.
+Milestones fan out to an auction's registrants in batches.
+"""
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from american_auction.scheduling import run_at
+from users.enums import EmailKind
+from users.models import OutboxEmail, User
+from users.outbox import queue_email, queue_emails
+from .models import Auction, AuctionAsset, BidEvent, Notification, RegistrationFee
+from .enums import AuctionStatus, NotificationKind
+from auctions import constants
+
+MILESTONES = {
+    AuctionStatus.UPCOMING: (NotificationKind.AUCTION_UPCOMING, "Auction {name} starts on {start_at:%Y-%m-%d at %H:%M}."),
+    AuctionStatus.ACTIVE: (NotificationKind.AUCTION_STARTED, "Auction {name} is now open for bidding."),
+    AuctionStatus.FINISHED: (NotificationKind.AUCTION_FINISHED, "Auction {name} has ended."),
+}
+
+
+def _outbid_pending_key(auction_asset_id):
+    return f"notifications:outbid:auction_asset:{auction_asset_id}:pending"
+
+
+def schedule_outbid_notifications(auction_asset_id):
+    """Queue at most one outbid notification task per lot and window."""
+    window = constants.NOTIFICATION_COALESCE_WINDOW
+    # The marker outlives the window so a lost task does not block the lot for long.
+    if cache.add(_outbid_pending_key(auction_asset_id), True, window * 2):
+        run_at('auctions.notifications.send_outbid_notifications', auction_asset_id,
+               at=timezone.now() + timedelta(seconds=window),
+               name=f"send_outbid_notifications:{auction_asset_id}")
+
+
+def send_outbid_notifications(auction_asset_id):
+    """Notify every bidder outbid on the lot since the last notification.
+
+    Returns the number of users notified.
+    """
+    cache.delete(_outbid_pending_key(auction_asset_id))
+    notified_up_to = Notification.objects.filter(
+        auction_asset_id=auction_asset_id, kind=NotificationKind.OUTBID,
+    ).aggregate(sequence=Max('sequence'))['sequence'] or 0
+
+    # Start from the last event already handled: it holds the leader the
+    # first new bid displaced.
+    events = list(BidEvent.objects.filter(
+        auction_asset_id=auction_asset_id, sequence__gte=max(notified_up_to, 1),
+    ).order_by('sequence').values_list('sequence', 'user_id', 'amount'))
+    if not events:
+        return 0
+
+    latest = {}
+    counts = Counter()
+    for (_, previous_user, _), (sequence, user_id, amount) in zip(events, events[1:]):
+        if previous_user != user_id:
+            latest[previous_user] = (sequence, amount)
+            counts[previous_user] += 1
+    latest.pop(events[-1][1], None)
+    if not latest:
+        return 0
+
+    asset_name = AuctionAsset.objects.filter(pk=auction_asset_id).values_list('asset__name', flat=True).first()
+    unread = {
+        notification.user_id: notification
+        for notification in Notification.objects.filter(
+            auction_asset_id=auction_asset_id, kind=NotificationKind.OUTBID, is_read=False, user_id__in=latest)
+    }
+    emails = dict(User.objects.filter(pk__in=latest).values_list('pk', 'email'))
+
+    now = timezone.now()
+    created, updated = [], []
+    with transaction.atomic():
+        for user_id, (sequence, amount) in latest.items():
+            message = f"You have been outbid on {asset_name}. The current price is {amount}."
+            notification = unread.get(user_id)
+            if notification is None:
+                created.append(Notification(
+                    user_id=user_id, kind=NotificationKind.OUTBID, auction_asset_id=auction_asset_id,
+                    message=message, count=counts[user_id], sequence=sequence,
+                ))
+            else:
+                notification.message = message
+                notification.count += counts[user_id]
+                notification.sequence = sequence
+                notification.updated_at = now
+                updated.append(notification)
+            if emails.get(user_id):
+                queue_email(
+                    EmailKind.NOTIFICATION, emails[user_id], f"[American Auction] Outbid on {asset_name}", message,
+                    user_id=user_id, dedup_key=f"outbid:{auction_asset_id}",
+                )
+        Notification.objects.bulk_create(created)
+        Notification.objects.bulk_update(updated, ['message', 'count', 'sequence', 'updated_at'])
+    return len(latest)
+
+
+def schedule_milestone_notifications(auction_id, auction_status):
+    if auction_status in MILESTONES:
+        async_task('auctions.notifications.send_milestone_notifications', auction_id, auction_status)
+
+
+def send_milestone_notifications(auction_id, auction_status):
+    """Notify everyone registered for the auction, NOTIFICATION_BATCH_SIZE at a time.
+
+    Registrants already notified of this milestone are skipped, so a retried
+    task does not notify twice. Returns the number of users notified.
+    """
+    kind, template = MILESTONES[auction_status]
+    auction = Auction.objects.get(pk=auction_id)
+    message = template.format(name=auction.name, start_at=auction.start_at)
+    subject = f"[American Auction] {auction.name}"
+
+    registrants = RegistrationFee.objects.filter(auction_id=auction_id).order_by('pk').values_list(
+        'user_id', 'user__email').iterator(chunk_size=constants.NOTIFICATION_BATCH_SIZE)
+    notified = 0
+    while True:
+        batch = list(islice(registrants, constants.NOTIFICATION_BATCH_SIZE))
+        if not batch:
+            break
+        already_notified = set(Notification.objects.filter(
+            auction_id=auction_id, kind=kind, user_id__in=[user_id for user_id, _ in batch],
+        ).values_list('user_id', flat=True))
+        batch = [(user_id, email) for user_id, email in batch if user_id not in already_notified]
+        with transaction.atomic():
+            Notification.objects.bulk_create([
+                Notification(user_id=user_id, kind=kind, auction_id=auction_id, message=message)
+                for user_id, _ in batch
+            ])
+            queue_emails([
+                OutboxEmail(
+                    user_id=user_id, kind=EmailKind.NOTIFICATION, dedup_key=f"{kind}:{auction_id}",
+                    recipient=email, subject=subject, body=message,
+                )
+                for user_id, email in batch if email
+            ])
+        notified += len(batch)
+    return notified
@@ -0,0 +1,87 @@
+"""Everything needed to render one auction page, in a constant number of queries.
+
+The page is cached in two parts: the auction, its lots, assets and media
+change rarely and are cached under the auction's scope, while lot prices
+change with every bid and are cached under the auction assets scope, which
+the bid path invalidates.
+"""
+from django.shortcuts import get_object_or_404
+
+from assets.delivery import content_url
+from .models import Auction, AuctionAsset
+from .serializers import AuctionSerializer
+from .caching import get_or_build, store, auction_scope, auction_assets_scope
+
+
+def _lot(auction_asset):
+    asset = auction_asset.asset
+    return {
+        'id': auction_asset.id,
+        'start_at': auction_asset.start_at,
+        'end_at': auction_asset.end_at,
+        'starting_price': auction_asset.starting_price,
+        'asset': {
+            'id': asset.id,
+            'name': asset.name,
+            'description': asset.description,
+            'category': asset.category,
+            'size': asset.size,
+            'warehouse': asset.warehouse,
+            'origin': asset.origin,
+            'quantity': asset.quantity,
+            'appraised_value': asset.appraised_value,
+            'media': [
+                {
+                    'id': media.id,
+                    'media_type': media.media_type,
+                    'url': content_url(media),
+                    'mime_type': media.mime_type,
+                    'file_size': media.file_size,
+                    'width': media.width,
+                    'height': media.height,
+                    'duration': media.duration,
+                    'variants': {variant.name: content_url(media, variant=variant) for variant in media.variants.all()},
+                }
+                for media in asset.media.all()
+            ],
+        },
+    }
+
+
+def build_auction_page(auction, auction_assets):
+    """The static part of the page; ``auction_assets`` must have asset and media preloaded."""
+    return {
+        'auction': AuctionSerializer(auction).data,
+        'lots': [_lot(auction_asset) for auction_asset in auction_assets],
+    }
+
+
+def build_auction_prices(auction_id):
+    return {
+        pk: {'current_price': current_price, 'bid_count': bid_count, 'final_price': final_price}
+        for pk, current_price, bid_count, final_price in AuctionAsset.objects.filter(
+            auction_id=auction_id).values_list('pk', 'current_price', 'bid_count', 'final_price')
+    }
+
+
+def store_auction_page(auction, auction_assets):
+    store(auction_scope(auction.id), 'page', build_auction_page(auction, auction_assets))
+
+
+def get_auction_page(auction_id):
+    def build():
+        auction = get_object_or_404(Auction, pk=auction_id)
+        auction_assets = (
+            AuctionAsset.objects.filter(auction=auction)
+            .select_related('asset')
+            .prefetch_related('asset__media__variants')
+            .order_by('start_at', 'pk')
+        )
+        return build_auction_page(auction, auction_assets)
+
+    page = get_or_build(auction_scope(auction_id), 'page', build)
+    prices = get_or_build(auction_assets_scope(auction_id), 'prices', lambda: build_auction_prices(auction_id))
+    return {
+        'auction': page['auction'],
+        'lots': [{**lot, **prices.get(lot['id'], {})} for lot in page['lots']],
+    }
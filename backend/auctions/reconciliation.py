@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RegistrationFee, AssetDeposit, Contract
+from .enums import PaymentStatus, ContractStatus
+from .eligibility import add_eligible_bidders
+from .concurrency import bump_version
+from auctions import constants
+
+
+# kind -> (model, amount due field, payment status field)
+PAYMENT_TARGETS = {
+    'registration': (RegistrationFee, 'amount', 'registration_payment_status'),
+    'deposit': (AssetDeposit, 'amount', 'deposit_payment_status'),
+    'contract_winner': (Contract, 'winner_amount_due', 'winner_payment_status'),
+    'contract_seller': (Contract, 'seller_amount_due', 'seller_payment_status'),
+}
+
+
+class ReconciliationReport:
+    """Running totals of a reconciliation import, with a bounded error sample."""
+
+    def __init__(self, max_errors=constants.RECONCILIATION_MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.lines = 0
+        self.paid = {kind: 0 for kind in PAYMENT_TARGETS}
+        self.contracts_completed = 0
+        self.already_paid = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, reference, error):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'reference': reference, 'error': error})
+
+    def as_dict(self):
+        return {
+            'lines': self.lines,
+            'paid': self.paid,
+            'contracts_completed': self.contracts_completed,
+            'already_paid': self.already_paid,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+        }
+
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    raise ValueError("Unsupported statement format, expected a .csv or .jsonl file.")
+
+
+def iter_statement_lines(fileobj, fmt):
+    """Yield ``(line_number, record)`` pairs from a binary CSV or JSONL stream."""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            for record in reader:
+                yield reader.line_num, record
+        elif fmt == 'jsonl':
+            for line_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield line_number, record if isinstance(record, dict) else None
+        else:
+            raise ValueError(f"Unsupported statement format: {fmt}")
+    finally:
+        text.detach()
+
+
+def parse_reference(reference):
+    prefix, _, pk = (reference or '').strip().upper().partition('-')
+    kind = constants.PAYMENT_REFERENCE_PREFIXES.get(prefix)
+    if kind is None or not pk.isdigit():
+        return None, None
+    return kind, int(pk)
+
+
+def reconcile_statement(fileobj, fmt, chunk_size=constants.RECONCILIATION_CHUNK_SIZE):
+    """Apply a bank statement to registration fees, deposits and contracts.
+
+    The statement is consumed in chunks so memory stays bounded regardless of
+    the file size; each chunk is matched and applied in its own transaction.
+    """
+    report = ReconciliationReport()
+    lines = iter_statement_lines(fileobj, fmt)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            break
+        report.lines += len(chunk)
+        with transaction.atomic():
+            _reconcile_chunk(chunk, report)
+    return report
+
+
+def _reconcile_chunk(chunk, report):
+    pending = {kind: {} for kind in PAYMENT_TARGETS}
+
+    for line_number, record in chunk:
+        if record is None:
+            report.add_error(line_number, None, "Malformed line.")
+            continue
+        reference = record.get('reference')
+        kind, pk = parse_reference(reference)
+        if kind is None:
+            report.add_error(line_number, reference, "Unknown payment reference.")
+            continue
+        try:
+            amount = Decimal(str(record.get('amount')).strip())
+        except (InvalidOperation, ValueError):
+            report.add_error(line_number, reference, "Invalid amount.")
+            continue
+        if pk in pending[kind]:
+            report.add_error(line_number, reference, "Duplicate payment reference in statement.")
+            continue
+        pending[kind][pk] = (line_number, reference, amount)
+
+    now = timezone.now()
+    touched_contracts = set()
+    for kind, lines in pending.items():
+        if not lines:
+            continue
+        model, due_field, status_field = PAYMENT_TARGETS[kind]
+        rows = model.objects.filter(pk__in=lines.keys()).values_list('pk', due_field, status_field)
+        found = {pk: (due, payment_status) for pk, due, payment_status in rows}
+
+        to_pay = []
+        for pk, (line_number, reference, amount) in lines.items():
+            if pk not in found:
+                report.add_error(line_number, reference, "No matching payment found.")
+                continue
+            due, payment_status = found[pk]
+            if payment_status == PaymentStatus.PAID:
+                report.already_paid += 1
+            elif amount < due:
+                report.add_error(line_number, reference, f"Paid amount {amount} is less than the amount due {due}.")
+            else:
+                to_pay.append(pk)
+
+        if to_pay:
+            report.paid[kind] += bump_version(
+                model.objects.filter(pk__in=to_pay, **{status_field: PaymentStatus.UNPAID}),
+                **{status_field: PaymentStatus.PAID, 'updated_at': now})
+            if model is Contract:
+                touched_contracts.update(to_pay)
+            elif model is AssetDeposit:
+                bidders = list(AssetDeposit.objects.filter(pk__in=to_pay).values_list('auction_asset_id', 'user_id'))
+                transaction.on_commit(lambda bidders=bidders: add_eligible_bidders(bidders))
+
+    if touched_contracts:
+        report.contracts_completed += bump_version(
+            Contract.objects.filter(
+                pk__in=touched_contracts,
+                status=ContractStatus.ACTIVE,
+                winner_payment_status=PaymentStatus.PAID,
+                seller_payment_status=PaymentStatus.PAID,
+            ),
+            status=ContractStatus.COMPLETED, updated_at=now)
@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AuctionAsset, Bid, BidEvent
+from .bid_stats import invalidate_bid_stats
+from .caching import asset_scope, auction_assets_scope, invalidate
+from .concurrency import bump_version
+from auctions import constants
+
+
+class ReplayedLot:
+    __slots__ = ('auction_asset_id', 'current_price', 'bid_count', 'highest_bid_id', 'anomalies', 'stored')
+
+    def __init__(self, auction_asset_id, starting_price):
+        self.auction_asset_id = auction_asset_id
+        self.current_price = starting_price
+        self.bid_count = 0
+        self.highest_bid_id = None
+        self.anomalies = []
+        self.stored = None
+
+    def apply(self, sequence, bid_id, amount):
+        if sequence != self.bid_count + 1:
+            self.anomalies.append(f"Expected sequence {self.bid_count + 1}, found {sequence}.")
+        if amount <= self.current_price:
+            self.anomalies.append(f"Event {sequence} amount {amount} does not exceed the price {self.current_price}.")
+        self.current_price = max(self.current_price, amount)
+        self.bid_count += 1
+        self.highest_bid_id = bid_id
+
+    def as_dict(self):
+        return {
+            'auction_asset': self.auction_asset_id,
+            'stored': self.stored,
+            'replayed': {'current_price': self.current_price, 'bid_count': self.bid_count, 'highest_bid': self.highest_bid_id},
+            'anomalies': self.anomalies,
+        }
+
+
+def replay_bid_log(auction_assets):
+    """Recompute price state from the bid log in a single streaming pass.
+
+    ``auction_assets`` is an AuctionAsset queryset. Returns the replayed lots
+    whose stored state differs from the log (or whose log is inconsistent).
+    """
+    stored = {
+        pk: (starting_price, current_price, bid_count)
+        for pk, starting_price, current_price, bid_count in auction_assets.values_list(
+            'pk', 'starting_price', 'current_price', 'bid_count')
+    }
+    lots = {pk: ReplayedLot(pk, values[0]) for pk, values in stored.items()}
+
+    events = BidEvent.objects.filter(auction_asset_id__in=lots.keys()).order_by(
+        'auction_asset_id', 'sequence').values_list('auction_asset_id', 'sequence', 'bid_id', 'amount')
+    for auction_asset_id, sequence, bid_id, amount in events.iterator(chunk_size=constants.REPLAY_CHUNK_SIZE):
+        lots[auction_asset_id].apply(sequence, bid_id, amount)
+
+    stored_highest = {}
+    for auction_asset_id, bid_id in Bid.objects.filter(
+            auction_asset_id__in=lots.keys(), is_current_highest=True).values_list('auction_asset_id', 'id'):
+        stored_highest.setdefault(auction_asset_id, set()).add(bid_id)
+
+    mismatches = []
+    for pk, lot in lots.items():
+        _, current_price, bid_count = stored[pk]
+        expected_highest = {lot.highest_bid_id} if lot.highest_bid_id else set()
+        actual_highest = stored_highest.get(pk, set())
+        if (current_price, bid_count, actual_highest) != (lot.current_price, lot.bid_count, expected_highest) or lot.anomalies:
+            lot.stored = {'current_price': current_price, 'bid_count': bid_count, 'highest_bids': sorted(actual_highest)}
+            mismatches.append(lot)
+    return mismatches
+
+
+def apply_replayed_state(lots):
+    """Overwrite stored price state with the replayed values and drop cached copies of it."""
+    now = timezone.now()
+    ids = [lot.auction_asset_id for lot in lots]
+    with transaction.atomic():
+        for lot in lots:
+            bump_version(
+                AuctionAsset.objects.filter(pk=lot.auction_asset_id),
+                current_price=lot.current_price, bid_count=lot.bid_count, updated_at=now)
+            Bid.objects.filter(auction_asset_id=lot.auction_asset_id, is_current_highest=True).exclude(
+                pk=lot.highest_bid_id).update(is_current_highest=False, updated_at=now)
+            if lot.highest_bid_id:
+                Bid.objects.filter(pk=lot.highest_bid_id).update(is_current_highest=True, updated_at=now)
+
+    for auction_id, asset_id in AuctionAsset.objects.filter(pk__in=ids).values_list('auction_id', 'asset_id'):
+        invalidate(auction_assets_scope(auction_id), asset_scope(asset_id))
+    for auction_asset_id in ids:
+        invalidate_bid_stats(auction_asset_id)
+
+
+def backfill_bid_log(auction_assets):
+    """Seed the log from existing bids for auction assets that have no events yet."""
+    missing = auction_assets.exclude(pk__in=BidEvent.objects.values('auction_asset_id')).values_list('pk', flat=True)
+    created = 0
+    for auction_asset_id in list(missing):
+        bids = Bid.objects.filter(auction_asset_id=auction_asset_id).order_by('amount', 'created_at', 'pk')
+        events = [
+            BidEvent(
+                auction_asset_id=auction_asset_id,
+                sequence=sequence,
+                bid_id=bid_id,
+                user_id=user_id,
+                amount=amount,
+                created_at=created_at,
+            )
+            for sequence, (bid_id, user_id, amount, created_at) in enumerate(
+                bids.values_list('pk', 'user_id', 'amount', 'created_at').iterator(), start=1)
+        ]
+        BidEvent.objects.bulk_create(events, batch_size=constants.REPLAY_CHUNK_SIZE)
+        created += len(events)
+    return created
@@ -0,0 +1,322 @@
+"""Single-writer bid sequencing.
+
+Each sequencer process owns the AuctionAssets whose id falls in its partition.
+Web workers forward bids to the owner, which orders them in memory, decides
+accept or reject against the lot's in-memory price, and persists accepted bids
+in group commits (one transaction per batch instead of one per bid).
+Bids submitted with a ticket are acknowledged as soon as they are ordered.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AuctionAsset, Bid
+from .serializers import BidSerializer
+from .bid_log import append_bid_events, publish_bid_events, publish_bid_outcomes
+from .concurrency import VersionConflict, bump_version
+from .dashboard import invalidate_dashboard
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class SequencerUnavailable(Exception):
+    pass
+
+
+def _config():
+    return settings.BID_SEQUENCER
+
+
+def is_enabled():
+    return _config()['ENABLED']
+
+
+def is_async_ack():
+    return _config()['ASYNC_ACK']
+
+
+def partition_for(auction_asset_id):
+    return auction_asset_id % _config()['PARTITIONS']
+
+
+def _address(partition):
+    config = _config()
+    return (config['HOST'], config['BASE_PORT'] + partition)
+
+
+def _authkey():
+    return _config()['AUTHKEY'].encode()
+
+
+def _connection(partition):
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(partition)
+    if conn is None:
+        conn = connections[partition] = Client(_address(partition), authkey=_authkey())
+    return conn
+
+
+def _drop_connection(partition):
+    conn = getattr(_local, 'connections', {}).pop(partition, None)
+    if conn is not None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+def submit_bid(auction_asset_id, user_id, amount, ticket=None):
+    """Send a bid to the owning sequencer and wait for its decision.
+
+    Returns ``{'accepted': True, 'bid': {...}}`` once the bid is committed, or
+    ``{'accepted': False, 'error': ...}``. With a ``ticket`` the sequencer
+    answers ``{'accepted': True, 'sequence': n}`` as soon as the bid is
+    ordered and publishes the final outcome under that ticket.
+    """
+    partition = partition_for(auction_asset_id)
+    message = {'auction_asset': auction_asset_id, 'user': user_id, 'amount': amount, 'ticket': ticket}
+    try:
+        try:
+            conn = _connection(partition)
+            conn.send(message)
+        except (EOFError, OSError):
+            # A cached connection may be stale after an owner restart; the bid
+            # was not delivered, so it is safe to resend on a fresh connection.
+            _drop_connection(partition)
+            conn = _connection(partition)
+            conn.send(message)
+        if not conn.poll(_config()['TIMEOUT']):
+            raise SequencerUnavailable("The bid sequencer did not answer in time.")
+        return conn.recv()
+    except (EOFError, OSError, SequencerUnavailable) as e:
+        _drop_connection(partition)
+        if isinstance(e, SequencerUnavailable):
+            raise
+        raise SequencerUnavailable(str(e)) from e
+
+
+class LotState:
+    __slots__ = ('auction_id', 'asset_id', 'current_price', 'bid_count', 'version')
+
+    def __init__(self, auction_asset):
+        self.auction_id = auction_asset.auction_id
+        self.asset_id = auction_asset.asset_id
+        self.current_price = auction_asset.current_price
+        self.bid_count = auction_asset.bid_count
+        self.version = auction_asset.version
+
+
+class BidSequencer:
+    def __init__(self, partition):
+        config = _config()
+        self.partition = partition
+        self.batch_size = config['BATCH_SIZE']
+        self.batch_window = config['BATCH_WINDOW_MS'] / 1000
+        self.requests = queue.Queue()
+        self.lots = {}
+        # Failure outcomes for tickets acknowledged in the current batch,
+        # published if the batch does not commit.
+        self.unpublished = {}
+
+    def serve_forever(self):
+        # No authkey on the listener: the handshake runs in each connection's
+        # thread, so a slow or hostile client cannot stall or crash accept().
+        listener = Listener(_address(self.partition))
+        logger.info("Bid sequencer partition %s listening on %s:%s", self.partition, *listener.address)
+        threading.Thread(target=self._write_loop, daemon=True).start()
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        try:
+            deliver_challenge(conn, _authkey())
+            answer_challenge(conn, _authkey())
+        except (EOFError, OSError, AuthenticationError):
+            conn.close()
+            return
+        try:
+            while True:
+                message = conn.recv()
+                future = Future()
+                self.requests.put((message, future))
+                conn.send(future.result())
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _write_loop(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception:
+                logger.exception("Bid sequencer partition %s failed to process a batch", self.partition)
+                # Drop all in-memory state and the (possibly broken) database
+                # connection; lots are reloaded on their next bid.
+                self.lots.clear()
+                connection.close()
+                self._publish_failures()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result({'accepted': False, 'error': "The bid could not be recorded, please retry."})
+
+    def _after_commit(self, func, *args):
+        """Run a side effect of a committed batch, logging instead of raising.
+
+        Failing the batch at this point would tell clients to retry bids that
+        are already stored.
+        """
+        try:
+            func(*args)
+        except Exception:
+            logger.exception("Bid sequencer partition %s: %s failed after commit", self.partition, func.__name__)
+
+    def _bid_data(self, bid):
+        try:
+            return dict(BidSerializer(bid).data)
+        except Exception:
+            logger.exception("Bid sequencer partition %s failed to serialize bid %s", self.partition, bid.pk)
+            return {'id': bid.pk, 'user': bid.user_id, 'auction_asset': bid.auction_asset_id, 'amount': str(bid.amount)}
+
+    def _publish_failures(self):
+        failures, self.unpublished = self.unpublished, {}
+        if failures:
+            try:
+                publish_bid_outcomes(failures)
+            except Exception:
+                logger.exception("Bid sequencer partition %s failed to publish %s failed outcomes",
+                                 self.partition, len(failures))
+
+    def _evict_stale_lots(self, batch):
+        """Drop cached lots whose row was written outside this sequencer.
+
+        Every write to an AuctionAsset advances its version, so one query per
+        batch is enough to notice a price changed by the direct bid path, a
+        replay or an admin.
+        """
+        cached = {message['auction_asset'] for message, _ in batch} & self.lots.keys()
+        if not cached:
+            return
+        versions = dict(AuctionAsset.objects.filter(pk__in=cached).values_list('pk', 'version'))
+        for auction_asset_id in cached:
+            if versions.get(auction_asset_id) != self.lots[auction_asset_id].version:
+                del self.lots[auction_asset_id]
+
+    def _lot(self, auction_asset_id):
+        lot = self.lots.get(auction_asset_id)
+        if lot is None:
+            auction_asset = AuctionAsset.objects.get(pk=auction_asset_id)
+            lot = self.lots[auction_asset_id] = LotState(auction_asset)
+        return lot
+
+    def _process(self, batch):
+        self._evict_stale_lots(batch)
+        accepted = []
+        for message, future in batch:
+            auction_asset_id = message['auction_asset']
+            if partition_for(auction_asset_id) != self.partition:
+                future.set_result({'accepted': False, 'error': "Bid routed to the wrong sequencer partition."})
+                continue
+            try:
+                lot = self._lot(auction_asset_id)
+            except AuctionAsset.DoesNotExist:
+                future.set_result({'accepted': False, 'error': "Auction asset not found."})
+                continue
+            if message['amount'] <= lot.current_price:
+                future.set_result({'accepted': False, 'error': "Bid amount must be higher than the current price."})
+                continue
+            lot.current_price = message['amount']
+            lot.bid_count += 1
+            bid = Bid(user_id=message['user'], auction_asset_id=auction_asset_id, amount=message['amount'])
+            accepted.append((bid, lot.bid_count, message.get('ticket'), future))
+            if message.get('ticket'):
+                # Asynchronous acknowledgement: the order is decided, the
+                # outcome is published once the batch is committed.
+                self.unpublished[message['ticket']] = {
+                    'status': 'failed', 'user': bid.user_id, 'auction_asset': auction_asset_id,
+                    'sequence': lot.bid_count, 'error': "The bid could not be recorded, please retry.",
+                }
+                future.set_result({'accepted': True, 'sequence': lot.bid_count})
+
+        if not accepted:
+            return
+
+        events = self._commit([(bid, sequence) for bid, sequence, _, _ in accepted])
+        # Committed: from here on every bid is answered as accepted, whatever
+        # happens to the side effects.
+        self.unpublished = {}
+
+        outcomes = {}
+        for bid, sequence, ticket, future in accepted:
+            data = self._bid_data(bid)
+            if ticket:
+                outcomes[ticket] = {
+                    'status': 'accepted', 'user': bid.user_id, 'auction_asset': bid.auction_asset_id,
+                    'sequence': sequence, 'bid': data,
+                }
+            else:
+                future.set_result({'accepted': True, 'bid': data})
+        self._after_commit(publish_bid_outcomes, outcomes)
+        self._after_commit(invalidate_dashboard, *{bid.user_id for bid, _, _, _ in accepted})
+        for auction_asset_id in dict.fromkeys(bid.auction_asset_id for bid, _, _, _ in accepted):
+            self._after_commit(
+                publish_bid_events, self.lots[auction_asset_id],
+                [event for event in events if event.auction_asset_id == auction_asset_id])
+
+    def _commit(self, sequenced_bids):
+        now = timezone.now()
+        bids = [bid for bid, _ in sequenced_bids]
+        highest = {}
+        for bid in bids:
+            highest[bid.auction_asset_id] = bid
+        for bid in highest.values():
+            bid.is_current_highest = True
+
+        with transaction.atomic():
+            Bid.objects.filter(
+                auction_asset_id__in=highest.keys(), is_current_highest=True
+            ).update(is_current_highest=False, updated_at=now)
+            if connection.features.can_return_rows_from_bulk_insert:
+                Bid.objects.bulk_create(bids)
+            else:
+                for bid in bids:
+                    bid.save()
+            events = append_bid_events(sequenced_bids)
+            for auction_asset_id in highest:
+                lot = self.lots[auction_asset_id]
+                # Compare-and-set on the version the lot was loaded or last
+                # written at: a write that slipped in since the batch started
+                # rolls the whole batch back instead of being overwritten.
+                if not bump_version(
+                        AuctionAsset.objects.filter(pk=auction_asset_id, version=lot.version),
+                        current_price=lot.current_price, bid_count=lot.bid_count, updated_at=now):
+                    raise VersionConflict()
+            for auction_asset_id in highest:
+                self.lots[auction_asset_id].version += 1
+        return events
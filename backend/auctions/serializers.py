@@ -1,18 +1,64 @@
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
 from assets.serializers import AssetSerializer
-from .models import Auction, AuctionAsset, RegistrationFee, AssetDeposit, Bid, Fee, Tax, Contract, ContractFee, ContractTax
+from .models import Auction, AuctionAsset, RegistrationFee, AssetDeposit, Bid, BidEvent, Fee, Tax, Contract, ContractFee, ContractTax, Notification
 from .enums import AuctionStatus
 from auctions import constants
 
+class UniqueConstraintMixin:
+    """Let the database's unique constraints reject duplicate rows.
+
+    Instead of checking with a query before inserting (an extra round trip
+    that can still race), the insert is attempted and a unique violation is
+    reported as ``unique_error``, the payload the pre-check used to raise.
+    The write runs in a savepoint, so a violation leaves an enclosing
+    transaction usable. Serializers using this set ``validators = []`` in
+    Meta so DRF does not add its own UniqueTogetherValidator query.
+    """
+    unique_error = None
+
+    def create(self, validated_data):
+        return self._write(super().create, validated_data, None, validated_data)
+
+    def update(self, instance, validated_data):
+        return self._write(super().update, validated_data, instance, instance, validated_data)
+
+    def _conflicts(self, validated_data, instance):
+        """Whether a committed row shares a unique_together key with the write."""
+        model = self.Meta.model
+        for fields in model._meta.unique_together:
+            lookup = {
+                field: validated_data[field] if field in validated_data else getattr(instance, field, None)
+                for field in fields
+            }
+            rows = model.objects.filter(**lookup)
+            if instance is not None:
+                rows = rows.exclude(pk=instance.pk)
+            if rows.exists():
+                return True
+        return False
+
+    def _write(self, write, validated_data, instance, *args):
+        try:
+            with transaction.atomic():
+                return write(*args)
+        except IntegrityError:
+            # Error messages differ between backends; ask for the duplicate row instead.
+            if not self._conflicts(validated_data, instance):
+                raise
+            raise serializers.ValidationError(self.unique_error)
+
+
 class AuctionAssetSerializer(serializers.ModelSerializer):
     class Meta:
         model = AuctionAsset
         fields = ['id', 'auction', 'asset', 'start_at', 'end_at', 'starting_price', 'current_price',
-                  'final_price', 'bid_count', 'created_at', 'updated_at']
+                  'final_price', 'bid_count', 'version', 'created_at', 'updated_at']
         read_only_fields = ['id', 'starting_price', 'current_price',
-                            'final_price', 'start_at', 'end_at', 'bid_count', 'created_at', 'updated_at']
+                            'final_price', 'start_at', 'end_at', 'bid_count', 'version', 'created_at', 'updated_at']
 
 class AuctionSerializer(serializers.ModelSerializer):
     time_period = serializers.ChoiceField(
@@ -38,18 +84,18 @@ class AuctionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class RegistrationFeeSerializer(serializers.ModelSerializer):
+class RegistrationFeeSerializer(UniqueConstraintMixin, serializers.ModelSerializer):
+    unique_error = {'auction': ["You have already registered for this auction."]}
+
     class Meta:
         model = RegistrationFee
         fields = ['id', 'user', 'auction', 'amount',
-                  'registration_payment_status', 'created_at', 'updated_at']
+                  'registration_payment_status', 'payment_reference', 'version', 'created_at', 'updated_at']
         read_only_fields = [
-            'id', 'registration_payment_status', 'created_at', 'updated_at']
+            'id', 'registration_payment_status', 'version', 'created_at', 'updated_at']
+        validators = []
 
     def validate_auction(self, value):
-        user = self.context.get('user')
-        if RegistrationFee.objects.filter(user=user, auction=value).exists():
-            raise serializers.ValidationError("You have already registered for this auction.")
         if value.status != AuctionStatus.REGISTRATION:
             raise serializers.ValidationError(
                 "Registration is not open for this auction.")
@@ -61,13 +107,16 @@ class RegistrationFeeSerializer(serializers.ModelSerializer):
         return value
 
 
-class AssetDepositSerializer(serializers.ModelSerializer):
+class AssetDepositSerializer(UniqueConstraintMixin, serializers.ModelSerializer):
+    unique_error = {'auction_asset': ["You have already deposited for this asset."]}
+
     class Meta:
         model = AssetDeposit
         fields = ['id', 'user', 'auction_asset', 'percentage', 'deposit_payment_status', 'amount',
-                  'created_at', 'updated_at']
+                  'payment_reference', 'version', 'created_at', 'updated_at']
         read_only_fields = ['id', 'deposit_payment_status',
-                            'amount', 'created_at', 'updated_at']
+                            'amount', 'version', 'created_at', 'updated_at']
+        validators = []
 
     def validate_percentage(self, value):
         if value < 0 or value > 100:
@@ -75,12 +124,6 @@ class AssetDepositSerializer(serializers.ModelSerializer):
                 "Percentage must be between 0 and 100.")
         return value
 
-    def validate_auction_asset(self, value):
-        user = self.context.get('user')
-        if AssetDeposit.objects.filter(user=user, auction_asset=value).exists():
-            raise serializers.ValidationError("You have already deposited for this asset.")
-        return value
-    
     def create(self, validated_data):
         percentage = validated_data['percentage']
         auction_asset = validated_data['auction_asset']
@@ -98,6 +141,24 @@ class BidSerializer(serializers.ModelSerializer):
                             'created_at', 'updated_at']
 
 
+class BidSubmissionSerializer(serializers.Serializer):
+    auction_asset = serializers.IntegerField(min_value=1)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class BidEventSerializer(serializers.ModelSerializer):
+    is_own = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BidEvent
+        fields = ['sequence', 'auction_asset', 'bid_id', 'amount', 'created_at', 'is_own']
+        read_only_fields = fields
+
+    def get_is_own(self, obj):
+        request = self.context.get('request')
+        return bool(request) and obj.user_id == request.user.id
+
+
 class FeeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Fee
@@ -134,18 +195,15 @@ class TaxSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Amount cannot be negative.")
         return value
 
-class ContractFeeSerializer(serializers.ModelSerializer):
+class ContractFeeSerializer(UniqueConstraintMixin, serializers.ModelSerializer):
+    unique_error = {api_settings.NON_FIELD_ERRORS_KEY: ["This fee has already been added to the contract."]}
+
     class Meta:
         model = ContractFee
         fields = ['id', 'contract', 'fee',
                   'amount', 'created_at', 'updated_at']
         read_only_fields = ['id','amount', 'created_at', 'updated_at']
-
-    def validate(self, attrs):
-        if ContractFee.objects.filter(contract=attrs['contract'], fee=attrs['fee']).exists():
-            raise serializers.ValidationError(
-                "This fee has already been added to the contract.")
-        return attrs
+        validators = []
 
     def save(self, **kwargs):
         validated_data = self.validated_data
@@ -162,18 +220,15 @@ class ContractFeeSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ContractTaxSerializer(serializers.ModelSerializer):
+class ContractTaxSerializer(UniqueConstraintMixin, serializers.ModelSerializer):
+    unique_error = {api_settings.NON_FIELD_ERRORS_KEY: ["This tax has already been added to the contract."]}
+
     class Meta:
         model = ContractTax
         fields = ['id', 'contract', 'tax',
                   'amount', 'created_at', 'updated_at']
         read_only_fields = ['id', 'amount', 'created_at', 'updated_at']
-
-    def validate(self, attrs):
-        if ContractTax.objects.filter(contract=attrs['contract'], tax=attrs['tax']).exists():
-            raise serializers.ValidationError(
-                "This tax has already been added to the contract.")
-        return attrs
+        validators = []
 
     def save(self, **kwargs):
         validated_data = self.validated_data
@@ -200,12 +255,12 @@ class ContractSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'auction_asset', 'asset','winner', 'seller', 'status', 'contract_fees', 'contract_taxes',
             'winner_payment_status', 'seller_payment_status', 'payment_due_date',
-            'created_at', 'updated_at', 'final_price', 'total_fees',
-            'total_taxes', 'winner_amount_due', 'seller_amount_due'
+            'winner_payment_reference', 'seller_payment_reference', 'created_at', 'updated_at', 'final_price', 'total_fees',
+            'total_taxes', 'winner_amount_due', 'seller_amount_due', 'version'
         ]
         read_only_fields = [
             'id', 'status', 'winner', 'seller', 'winner_payment_status', 'seller_payment_status', 'created_at', 'updated_at', 'final_price',
-            'total_fees', 'total_taxes', 'winner_amount_due', 'seller_amount_due'
+            'total_fees', 'total_taxes', 'winner_amount_due', 'seller_amount_due', 'version'
         ]
 
     def get_asset(self, obj):
@@ -218,3 +273,16 @@ class ContractSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Payment due date must be in the future.")
         return value
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'kind', 'auction', 'auction_asset', 'message', 'count', 'is_read', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class ValuationRequestSerializer(serializers.Serializer):
+    assets = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=constants.VALUATION_BATCH_MAX_SIZE,
+    )
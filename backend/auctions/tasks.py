@@ -1,26 +1,57 @@
-from django_q.tasks import async_task
+from american_auction.scheduling import run_at
 from assets.enums import AssetStatus
+from django.db import transaction
 from django.utils import timezone
 from .enums import AuctionStatus
+from .models import Auction, AuctionAsset
+from .concurrency import VersionConflict, versioned_update
+from .eligibility import clear_eligibility_index
+from .caching import invalidate, auction_scope, auction_assets_scope, asset_scope
+from .warmup import warm_up_auction
+from .notifications import schedule_milestone_notifications
+from .valuation import record_sale
+from auctions import constants
 
-def finalize_asset(auction_asset):
-    highest_bid = auction_asset.bids.filter(
-        is_current_highest=True).first()
-    if highest_bid:
-        auction_asset.final_price = highest_bid.amount
-        auction_asset.asset.status = AssetStatus.SOLD
-        auction_asset.asset.winner = highest_bid.user
-    else:
-        auction_asset.asset.status = AssetStatus.PENDING
-    auction_asset.asset.save()
-    auction_asset.save()
+def finalize_asset(auction_asset_id):
+    auction_asset = AuctionAsset.objects.filter(pk=auction_asset_id).first()
+    if auction_asset is None:
+        return
+    for attempt in range(constants.FINALIZE_MAX_ATTEMPTS):
+        auction_asset.refresh_from_db()
+        asset = auction_asset.asset
+        highest_bid = auction_asset.bids.filter(
+            is_current_highest=True).first()
+        try:
+            with transaction.atomic():
+                # Version-checked, so a bid committed after the read above
+                # forces a retry instead of finalizing on a stale winner.
+                if highest_bid:
+                    versioned_update(auction_asset, final_price=highest_bid.amount)
+                    asset.status = AssetStatus.SOLD
+                    asset.winner = highest_bid.user
+                    record_sale(auction_asset, asset, highest_bid.amount,
+                                auction_asset.end_at or auction_asset.auction.end_at)
+                else:
+                    versioned_update(auction_asset)
+                    asset.status = AssetStatus.PENDING
+                asset.save(update_fields=['status', 'winner', 'updated_at'])
+            break
+        except VersionConflict:
+            if attempt == constants.FINALIZE_MAX_ATTEMPTS - 1:
+                raise
+    invalidate(auction_assets_scope(auction_asset.auction_id), asset_scope(auction_asset.asset_id))
 
-def schedule_finalize_asset(auction_asset, end_at):
-    now = timezone.now()
-    delay = (end_at - now).total_seconds()
-    async_task('path.to.finalize_asset', auction_asset, q_options={'delay': delay})
+def schedule_finalize_assets(auction):
+    """Finalize each lot of ``auction`` once its bidding closes."""
+    for auction_asset_id, end_at in AuctionAsset.objects.filter(auction=auction).values_list('pk', 'end_at'):
+        run_at('auctions.tasks.finalize_asset', auction_asset_id,
+               at=end_at or auction.end_at, name=f"finalize_asset:{auction_asset_id}")
 
-def update_auction_status(auction):
+def update_auction_status(auction_id):
+    auction = Auction.objects.filter(pk=auction_id).first()
+    if auction is None:
+        return
+    previous_status = auction.status
     now = timezone.now()
     if now >= auction.registration_end_at and now <= auction.start_at:
         auction.status = AuctionStatus.UPCOMING
@@ -29,13 +60,18 @@ def update_auction_status(auction):
     elif now >= auction.end_at:
         auction.status = AuctionStatus.FINISHED
     auction.save()
+    invalidate(auction_scope(auction.id))
+    if auction.status != previous_status:
+        schedule_milestone_notifications(auction.id, auction.status)
 
-def schedule_update_auction_status(auction, registration_end_at, start_at, end_at):
-    now = timezone.now()
-    delay_registration_end = (registration_end_at - now).total_seconds()
-    delay_start = (start_at - now).total_seconds()
-    delay_end = (end_at - now).total_seconds()
+    if auction.status == AuctionStatus.ACTIVE and previous_status != AuctionStatus.ACTIVE:
+        # Lots may have been added or moved since the auction was created.
+        schedule_finalize_assets(auction)
+        return warm_up_auction(auction)
+    elif auction.status != AuctionStatus.ACTIVE and previous_status == AuctionStatus.ACTIVE:
+        clear_eligibility_index(auction)
 
-    async_task('path.to.update_auction_status', auction, q_options={'delay': delay_registration_end})
-    async_task('path.to.update_auction_status', auction, q_options={'delay': delay_start})
-    async_task('path.to.update_auction_status', auction, q_options={'delay': delay_end})
+def schedule_update_auction_status(auction, registration_end_at, start_at, end_at):
+    for transition, at in (('registration_end', registration_end_at), ('start', start_at), ('end', end_at)):
+        run_at('auctions.tasks.update_auction_status', auction.id,
+               at=at, name=f"update_auction_status:{auction.id}:{transition}")
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     AuctionAssetReadOnlyViewSet, AuctionAssetViewSet, AuctionViewSet, BidViewSet, ContractViewSet, RegistrationFeeViewSet, AssetDepositViewSet,
-    TaxViewSet, FeeViewSet, ContractTaxViewSet, ContractFeeViewSet
+    TaxViewSet, FeeViewSet, ContractTaxViewSet, ContractFeeViewSet, NotificationViewSet, reconcile_payments, dashboard, valuations
 )
 
 router = DefaultRouter()
@@ -17,7 +17,11 @@ router.register('contract-taxes', ContractTaxViewSet, basename='contract-tax')
 router.register('contract-fees', ContractFeeViewSet, basename='contract-fee')
 router.register('registrations', RegistrationFeeViewSet, basename='registration')
 router.register('deposits', AssetDepositViewSet, basename='deposit')
+router.register('notifications', NotificationViewSet, basename='notification')
 
 urlpatterns = [
+    path('payments/reconcile/', reconcile_payments, name='reconcile_payments'),
+    path('dashboard/', dashboard, name='dashboard'),
+    path('valuations/', valuations, name='valuations'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,235 @@
+"""Comparable-sales statistics for appraisers.
+
+Every settled sale is folded into running statistics for its asset's
+category and origin: a count, sums for the mean, and histograms of hammer
+price (log-spaced buckets) and of hammer / appraised value ratio. Percentiles
+are read off the histograms, so a valuation needs a handful of queries for a
+whole batch of assets however long the sales history is. ``rebuild_stats``
+recomputes everything from the settled AuctionAssets.
+"""
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import AuctionAsset, ComparableSale, ValuationBucket, ValuationStats
+from .enums import ValuationDimension, ValuationMetric
+from auctions import constants
+
+
+def _keys(category, origin):
+    keys = [(ValuationDimension.CATEGORY, category)]
+    origin = (origin or '').strip().lower()
+    if origin:
+        keys.append((ValuationDimension.ORIGIN, origin))
+    return keys
+
+
+def price_bucket(price):
+    return math.floor(math.log(float(price), constants.VALUATION_PRICE_BUCKET_BASE))
+
+
+def ratio_bucket(ratio):
+    return min(math.floor(ratio / constants.VALUATION_RATIO_BUCKET_WIDTH), constants.VALUATION_RATIO_MAX_BUCKET)
+
+
+def _bucket_value(metric, bucket):
+    """The midpoint of a bucket."""
+    if metric == ValuationMetric.PRICE:
+        return constants.VALUATION_PRICE_BUCKET_BASE ** (bucket + 0.5)
+    return (bucket + 0.5) * constants.VALUATION_RATIO_BUCKET_WIDTH
+
+
+def _ratio(final_price, appraised_value):
+    return float(final_price) / float(appraised_value) if appraised_value else None
+
+
+def _add_to_bucket(stats_id, metric, bucket, sign):
+    buckets = ValuationBucket.objects.filter(stats_id=stats_id, metric=metric, bucket=bucket)
+    if sign < 0:
+        buckets.filter(count__gt=0).update(count=F('count') - 1)
+    elif not buckets.update(count=F('count') + 1):
+        _, created = ValuationBucket.objects.get_or_create(
+            stats_id=stats_id, metric=metric, bucket=bucket, defaults={'count': 1})
+        if not created:
+            buckets.update(count=F('count') + 1)
+
+
+def _apply(sale, sign):
+    """Add (``sign`` 1) or remove (``sign`` -1) one ComparableSale's contribution."""
+    ratio = _ratio(sale.final_price, sale.appraised_value)
+    for dimension, key in _keys(sale.category, sale.origin):
+        stats, _ = ValuationStats.objects.get_or_create(dimension=dimension, key=key)
+        ValuationStats.objects.filter(pk=stats.pk).update(
+            count=F('count') + sign,
+            price_sum=F('price_sum') + sign * sale.final_price,
+            ratio_count=F('ratio_count') + (sign if ratio is not None else 0),
+            ratio_sum=F('ratio_sum') + sign * (ratio or 0),
+            updated_at=timezone.now(),
+        )
+        _add_to_bucket(stats.pk, ValuationMetric.PRICE, price_bucket(sale.final_price), sign)
+        if ratio is not None:
+            _add_to_bucket(stats.pk, ValuationMetric.RATIO, ratio_bucket(ratio), sign)
+
+
+def record_sale(auction_asset, asset, final_price, sold_at):
+    """Fold a settled sale into the statistics; call inside the settling transaction.
+
+    Settling a lot again replaces its earlier sale, so a changed final price
+    moves the lot between buckets instead of being counted twice or ignored.
+    """
+    if final_price is None or final_price <= 0:
+        return
+    sale = ComparableSale.objects.select_for_update().filter(auction_asset=auction_asset).first()
+    if sale is not None:
+        if (sale.final_price, sale.appraised_value, sale.category, sale.origin) == (
+                final_price, asset.appraised_value, asset.category, asset.origin):
+            return
+        _apply(sale, -1)
+    else:
+        sale = ComparableSale(auction_asset=auction_asset, asset=asset)
+    sale.category = asset.category
+    sale.origin = asset.origin
+    sale.final_price = final_price
+    sale.appraised_value = asset.appraised_value
+    sale.sold_at = sold_at
+    sale.save()
+    _apply(sale, 1)
+
+
+def percentiles(histogram, metric):
+    """Map each of VALUATION_PERCENTILES to a bucket midpoint of ``{bucket: count}``."""
+    total = sum(histogram.values())
+    if not total:
+        return {}
+    result = {}
+    targets = iter(constants.VALUATION_PERCENTILES)
+    target = next(targets)
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        while target is not None and seen >= total * target / 100:
+            result[f"p{target}"] = round(_bucket_value(metric, bucket), 2)
+            target = next(targets, None)
+    return result
+
+
+def _summary(stats, histograms):
+    prices = percentiles(histograms[stats.pk, ValuationMetric.PRICE], ValuationMetric.PRICE)
+    ratios = percentiles(histograms[stats.pk, ValuationMetric.RATIO], ValuationMetric.RATIO)
+    return {
+        'count': stats.count,
+        'mean_price': round(stats.price_sum / stats.count, 2) if stats.count else None,
+        'price_percentiles': prices,
+        'ratio_count': stats.ratio_count,
+        'mean_ratio': round(stats.ratio_sum / stats.ratio_count, 3) if stats.ratio_count else None,
+        'ratio_percentiles': ratios,
+    }
+
+
+def _comparables(categories):
+    """Up to VALUATION_COMPARABLES recent sales per category, in one query."""
+    since = timezone.now() - timedelta(days=constants.VALUATION_COMPARABLES_DAYS)
+    sales = ComparableSale.objects.filter(category__in=categories, sold_at__gte=since).annotate(
+        rank=Window(RowNumber(), partition_by=F('category'), order_by=F('sold_at').desc()),
+    ).filter(rank__lte=constants.VALUATION_COMPARABLES).values(
+        'asset_id', 'category', 'origin', 'final_price', 'appraised_value', 'sold_at')
+    by_category = defaultdict(list)
+    for sale in sales:
+        by_category[sale.pop('category')].append(sale)
+    return by_category
+
+
+def valuations(assets):
+    """Statistics, a suggested range and comparables for each asset, by asset id."""
+    keys = {key for asset in assets for key in _keys(asset.category, asset.origin)}
+    if not keys:
+        return {}
+    query = Q()
+    for dimension, key in keys:
+        query |= Q(dimension=dimension, key=key)
+    stats = {(stats.dimension, stats.key): stats for stats in ValuationStats.objects.filter(query)}
+    histograms = defaultdict(dict)
+    for stats_id, metric, bucket, count in ValuationBucket.objects.filter(
+            stats__in=stats.values()).values_list('stats_id', 'metric', 'bucket', 'count'):
+        histograms[stats_id, metric][bucket] = count
+    comparables = _comparables({asset.category for asset in assets})
+
+    result = {}
+    for asset in assets:
+        summaries = {
+            dimension: _summary(stats[dimension, key], histograms)
+            for dimension, key in _keys(asset.category, asset.origin) if (dimension, key) in stats
+        }
+        # The narrower origin statistics win once they have enough sales behind them.
+        basis = ValuationDimension.CATEGORY
+        origin = summaries.get(ValuationDimension.ORIGIN)
+        if origin and origin['count'] >= constants.VALUATION_MIN_SAMPLES:
+            basis = ValuationDimension.ORIGIN
+        prices = summaries.get(basis, {}).get('price_percentiles', {})
+        result[asset.id] = {
+            'asset': asset.id,
+            'stats': summaries,
+            'suggested_range': {'basis': basis, 'low': prices['p25'], 'mid': prices['p50'], 'high': prices['p75']}
+            if prices else None,
+            'comparables': [sale for sale in comparables[asset.category] if sale['asset_id'] != asset.id],
+        }
+    return result
+
+
+def rebuild_stats():
+    """Recompute all statistics and comparable sales from the settled AuctionAssets.
+
+    Returns the number of sales counted.
+    """
+    totals = defaultdict(lambda: {'count': 0, 'price_sum': Decimal(0), 'ratio_count': 0, 'ratio_sum': 0.0})
+    histograms = defaultdict(Counter)
+    sales = []
+    settled = AuctionAsset.objects.filter(final_price__gt=0).select_related('asset', 'auction').order_by('pk')
+
+    with transaction.atomic():
+        ValuationStats.objects.all().delete()
+        ComparableSale.objects.all().delete()
+        for auction_asset in settled.iterator(chunk_size=constants.VALUATION_REBUILD_CHUNK_SIZE):
+            asset = auction_asset.asset
+            final_price = auction_asset.final_price
+            ratio = _ratio(final_price, asset.appraised_value)
+            for key in _keys(asset.category, asset.origin):
+                total = totals[key]
+                total['count'] += 1
+                total['price_sum'] += final_price
+                histograms[key, ValuationMetric.PRICE][price_bucket(final_price)] += 1
+                if ratio is not None:
+                    total['ratio_count'] += 1
+                    total['ratio_sum'] += ratio
+                    histograms[key, ValuationMetric.RATIO][ratio_bucket(ratio)] += 1
+            sales.append(ComparableSale(
+                auction_asset=auction_asset, asset=asset, category=asset.category, origin=asset.origin,
+                final_price=final_price, appraised_value=asset.appraised_value,
+                sold_at=auction_asset.end_at or auction_asset.auction.end_at,
+            ))
+            if len(sales) >= constants.VALUATION_REBUILD_CHUNK_SIZE:
+                ComparableSale.objects.bulk_create(sales)
+                sales = []
+        ComparableSale.objects.bulk_create(sales)
+
+        stats = ValuationStats.objects.bulk_create([
+            ValuationStats(dimension=dimension, key=key, **total) for (dimension, key), total in totals.items()
+        ])
+        if stats and stats[0].pk is None:
+            stats = list(ValuationStats.objects.all())
+        ids = {(stats.dimension, stats.key): stats.pk for stats in stats}
+        ValuationBucket.objects.bulk_create(
+            [
+                ValuationBucket(stats_id=ids[key], metric=metric, bucket=bucket, count=count)
+                for (key, metric), histogram in histograms.items()
+                for bucket, count in histogram.items()
+            ],
+            batch_size=constants.VALUATION_REBUILD_CHUNK_SIZE,
+        )
+    return sum(total['count'] for (dimension, _), total in totals.items() if dimension == ValuationDimension.CATEGORY)
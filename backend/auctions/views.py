@@ -1,6 +1,6 @@
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter
 from rest_framework.exceptions import ValidationError
@@ -10,13 +10,29 @@ from django.db import transaction
 from django.db.models import Q
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Auction, AuctionAsset, RegistrationFee, AssetDeposit, Bid, Contract, Tax, Fee, ContractTax, ContractFee
+from .models import Auction, AuctionAsset, RegistrationFee, AssetDeposit, Bid, Contract, Tax, Fee, ContractTax, ContractFee, Notification
 from .serializers import (
-    AssetDepositSerializer, AuctionAssetSerializer, AuctionSerializer, BidSerializer, ContractSerializer, RegistrationFeeSerializer, TaxSerializer, FeeSerializer, ContractFeeSerializer, ContractTaxSerializer
+    AssetDepositSerializer, AuctionAssetSerializer, AuctionSerializer, BidSerializer, BidEventSerializer, BidSubmissionSerializer, ContractSerializer, RegistrationFeeSerializer, TaxSerializer, FeeSerializer, ContractFeeSerializer, ContractTaxSerializer,
+    NotificationSerializer, ValuationRequestSerializer
 )
 from .enums import AuctionStatus, PaymentStatus, ContractStatus
 from .permissions import IsSeller, IsWinner
-from .tasks import schedule_finalize_asset, schedule_update_auction_status
+from .tasks import schedule_finalize_assets, schedule_update_auction_status
+from .reconciliation import detect_format, reconcile_statement
+from .eligibility import add_eligible_bidders, lookup_bid_eligibility
+from .sequencer import (
+    SequencerUnavailable, is_enabled as sequencer_enabled, is_async_ack as sequencer_async_ack, submit_bid
+)
+from .bid_log import (
+    append_bid_events, publish_bid_events, wait_for_events, advance_cursor, parse_cursor, format_cursor,
+    new_bid_ticket, get_bid_outcome, latest_sequence
+)
+from .caching import get_or_build, invalidate, auction_scope, auction_assets_scope, asset_scope
+from .bid_stats import leaderboard, price_series
+from .concurrency import versioned_update
+from .dashboard import get_dashboard, invalidate_dashboard
+from .page import get_auction_page
+from .valuation import valuations as build_valuations
 from assets.enums import AssetStatus
 from assets.models import Asset, AssetAppraisalStatus
 from users.permissions import IsStaffUser
@@ -73,6 +89,7 @@ class AuctionViewSet(viewsets.ModelViewSet):
                     status=AuctionStatus.REGISTRATION
                 )
                 self.add_random_assets(auction, eligible_assets, asset_count)
+                schedule_finalize_assets(auction)
                 schedule_update_auction_status(
                     auction, registration_end_at, start_at, end_at)
             else:
@@ -85,6 +102,20 @@ class AuctionViewSet(viewsets.ModelViewSet):
                 "auction": serializer.data
             }, status=status.HTTP_201_CREATED, headers=headers)
 
+    def retrieve(self, request, *args, **kwargs):
+        data = get_or_build(
+            auction_scope(kwargs['pk']), 'detail',
+            lambda: self.get_serializer(self.get_object()).data)
+        return Response(data)
+
+    def perform_update(self, serializer):
+        auction = serializer.save()
+        invalidate(auction_scope(auction.id))
+
+    @action(detail=True, methods=['get'])
+    def page(self, request, pk=None):
+        return Response(get_auction_page(pk))
+
     def destroy(self, request, *args, **kwargs):
         auction = self.get_object()
 
@@ -103,6 +134,7 @@ class AuctionViewSet(viewsets.ModelViewSet):
 
             response = super().destroy(request, *args, **kwargs)
 
+        invalidate(auction_scope(auction.id), auction_assets_scope(auction.id))
         return response
 
     def is_auction_slot_available(self, start_at, end_at):
@@ -190,11 +222,53 @@ class AuctionAssetReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
         auction = get_object_or_404(Auction, id=auction_id)
         return AuctionAsset.objects.filter(auction=auction)
 
+    def list(self, request, *args, **kwargs):
+        data = get_or_build(
+            auction_assets_scope(kwargs['auction_pk']), 'list',
+            lambda: self.get_serializer(self.get_queryset(), many=True).data)
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def leaderboard(self, request, auction_pk=None, pk=None):
+        auction_asset = self.get_object()
+        leaders = leaderboard(auction_asset.id)
+        # Bidders stay anonymous, as in the bid feed; callers only learn which entries are theirs.
+        user_id = request.user.id if request.user.is_authenticated else None
+        return Response([
+            {'rank': rank, 'amount': entry['amount'], 'created_at': entry['created_at'], 'is_own': entry['user'] == user_id}
+            for rank, entry in enumerate(leaders, start=1)
+        ])
+
+    @action(detail=True, methods=['get'], url_path='price-series')
+    def price_series(self, request, auction_pk=None, pk=None):
+        auction_asset = self.get_object()
+        try:
+            points = int(request.query_params.get('points', constants.PRICE_SERIES_DEFAULT_POINTS))
+        except ValueError:
+            return Response({"error": "points must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= points <= constants.PRICE_SERIES_MAX_POINTS:
+            return Response({"error": f"points must be between 1 and {constants.PRICE_SERIES_MAX_POINTS}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = auction_asset.start_at or auction_asset.auction.start_at
+        end = auction_asset.end_at or auction_asset.auction.end_at
+        end = min(end, timezone.now())
+        if end <= start:
+            return Response({"points": []})
+        return Response({"points": price_series(auction_asset, points, start, end)})
+
 class AuctionAssetViewSet(viewsets.ModelViewSet):
     serializer_class = AuctionAssetSerializer
     queryset = AuctionAsset.objects.all()
     permission_classes = [IsStaffUser]
-    
+
+    def perform_update(self, serializer):
+        auction_asset = versioned_update(serializer.instance, **serializer.validated_data)
+        invalidate(auction_scope(auction_asset.auction_id), auction_assets_scope(auction_asset.auction_id), asset_scope(auction_asset.asset_id))
+
+    def perform_destroy(self, instance):
+        invalidate(auction_scope(instance.auction_id), auction_assets_scope(instance.auction_id), asset_scope(instance.asset_id))
+        instance.delete()
+
 class BidViewSet(viewsets.ModelViewSet):
     serializer_class = BidSerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
@@ -203,7 +277,7 @@ class BidViewSet(viewsets.ModelViewSet):
     ordering = ['-amount']
 
     def get_permissions(self):
-        if self.action in ['create', 'list', 'retrieve']:
+        if self.action in ['create', 'list', 'retrieve', 'feed', 'outcome']:
             permission_classes = [permissions.IsAuthenticated]
         else:
             permission_classes = [IsStaffUser]
@@ -217,36 +291,140 @@ class BidViewSet(viewsets.ModelViewSet):
             return Bid.objects.all()
         return Bid.objects.none()
 
+    def eligibility_error(self, user, auction_asset_id, load_auction_asset):
+        """Return an error response if ``user`` may not bid on the lot, else None.
+
+        The eligibility index answers without queries; ``load_auction_asset`` is
+        only called when the index has no entry for the lot.
+        """
+        auction_status, has_paid_deposit = lookup_bid_eligibility(auction_asset_id, user.id)
+        if auction_status is None:
+            auction_asset = load_auction_asset()
+            if auction_asset is None:
+                return Response({"error": "Auction asset not found."}, status=status.HTTP_404_NOT_FOUND)
+            auction_status = auction_asset.auction.status
+        if auction_status != AuctionStatus.ACTIVE:
+            return Response({"error": "Bidding is not allowed at this time."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not has_paid_deposit:
+            if not AssetDeposit.objects.filter(user=user, auction_asset_id=auction_asset_id, deposit_payment_status=PaymentStatus.PAID).exists():
+                return Response({"error": "You must pay the asset deposit to place a bid."}, status=status.HTTP_400_BAD_REQUEST)
+            # The deposit may be paid in an enclosing, uncommitted transaction.
+            transaction.on_commit(lambda: add_eligible_bidders([(auction_asset_id, user.id)]))
+        return None
+
     def create(self, request, *args, **kwargs):
+        if sequencer_enabled() and transaction.get_connection().in_atomic_block:
+            # The sequencer commits in its own process.
+            return Response({"error": "Bids recorded by the sequencer cannot be rolled back; submit them outside an atomic batch."}, status=status.HTTP_400_BAD_REQUEST)
+        if sequencer_enabled() and sequencer_async_ack():
+            return self.submit_async(request)
+
         user = self.request.user
         serializer = self.get_serializer(data={'user':user.id,**request.data})
         serializer.is_valid(raise_exception=True)
     
         auction_asset = serializer.validated_data['auction_asset']
         amount = serializer.validated_data['amount']
-        
-        if auction_asset.auction.status != AuctionStatus.ACTIVE:
-            return Response({"error": "Bidding is not allowed at this time."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not AssetDeposit.objects.filter(user=user, auction_asset=auction_asset, deposit_payment_status=PaymentStatus.PAID).exists():
-            return Response({"error": "You must pay the asset deposit to place a bid."}, status=status.HTTP_400_BAD_REQUEST)
+        error = self.eligibility_error(user, auction_asset.id, lambda: auction_asset)
+        if error:
+            return error
 
         if amount <= auction_asset.current_price:
             return Response({"error": "Bid amount must be higher than the current price."}, status=status.HTTP_400_BAD_REQUEST)
 
+        if sequencer_enabled():
+            try:
+                result = submit_bid(auction_asset.id, user.id, amount)
+            except SequencerUnavailable:
+                return Response({"error": "Bidding is temporarily unavailable, please retry."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            if not result['accepted']:
+                return Response({"error": result['error']}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"message": "Bid created successfully", "bid": result['bid']}, status=status.HTTP_201_CREATED)
+
         with transaction.atomic():
-            bid = serializer.save()
-            auction_asset.current_price = bid.amount
-            auction_asset.bid_count += 1
-            auction_asset.save()
-            Bid.objects.filter(auction_asset=auction_asset).exclude(
-                id=bid.id).update(is_current_highest=False)
-            bid.is_current_highest = True
-            bid.save()
-            schedule_finalize_asset(auction_asset, auction_asset.end_at)
-            
+            # Compare-and-set on the version read above: a concurrent bid on the
+            # lot makes this one fail with 409 instead of queueing on a lock.
+            versioned_update(auction_asset, current_price=amount, bid_count=auction_asset.bid_count + 1)
+            Bid.objects.filter(auction_asset=auction_asset, is_current_highest=True).update(
+                is_current_highest=False, updated_at=timezone.now())
+            bid = serializer.save(auction_asset=auction_asset, is_current_highest=True)
+            events = append_bid_events([(bid, auction_asset.bid_count)])
+            transaction.on_commit(lambda: publish_bid_events(auction_asset, events))
+            transaction.on_commit(lambda: invalidate_dashboard(user.id))
+
+
         return Response({"message": "Bid created successfully", "bid":serializer.data}, status=status.HTTP_201_CREATED)
 
+    def submit_async(self, request):
+        user = request.user
+        serializer = BidSubmissionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        auction_asset_id = serializer.validated_data['auction_asset']
+        amount = serializer.validated_data['amount']
+
+        error = self.eligibility_error(
+            user, auction_asset_id,
+            lambda: AuctionAsset.objects.select_related('auction').filter(pk=auction_asset_id).first())
+        if error:
+            return error
+
+        ticket = new_bid_ticket()
+        try:
+            result = submit_bid(auction_asset_id, user.id, amount, ticket=ticket)
+        except SequencerUnavailable:
+            return Response({"error": "Bidding is temporarily unavailable, please retry."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if not result['accepted']:
+            return Response({"error": result['error']}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Bid accepted for processing.",
+            "ticket": ticket,
+            "auction_asset": auction_asset_id,
+            "amount": amount,
+            "sequence": result['sequence'],
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'])
+    def outcome(self, request):
+        outcome = get_bid_outcome(request.query_params.get('ticket', ''))
+        if outcome is not None and outcome['user'] != request.user.id:
+            outcome = None
+        if outcome is None:
+            return Response({"status": "pending"})
+
+        data = {key: value for key, value in outcome.items() if key != 'user'}
+        if data['status'] == 'accepted':
+            latest = latest_sequence(data['auction_asset'])
+            data['status'] = 'leading' if latest is None or latest <= data['sequence'] else 'outbid'
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        auction_asset_id = request.query_params.get('auction_asset')
+        auction_id = request.query_params.get('auction')
+        try:
+            wait = min(max(float(request.query_params.get('wait', 0)), 0), constants.BID_FEED_MAX_WAIT)
+            if auction_asset_id:
+                positions = {int(auction_asset_id): int(request.query_params.get('after', 0))}
+            elif auction_id:
+                positions = dict.fromkeys(
+                    AuctionAsset.objects.filter(auction_id=int(auction_id)).values_list('id', flat=True), 0)
+                cursor = parse_cursor(request.query_params.get('cursor'))
+                positions.update({pk: sequence for pk, sequence in cursor.items() if pk in positions})
+            else:
+                return Response({"error": "Either 'auction_asset' or 'auction' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"error": "Invalid feed parameters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        events = wait_for_events(positions, wait)
+        positions = advance_cursor(positions, events)
+        return Response({
+            "events": BidEventSerializer(events, many=True, context={'request': request}).data,
+            "cursor": positions[int(auction_asset_id)] if auction_asset_id else format_cursor(positions),
+        })
+
 
 class RegistrationFeeViewSet(viewsets.ModelViewSet):
     queryset = RegistrationFee.objects.all()
@@ -273,6 +451,7 @@ class RegistrationFeeViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         serializer.save()
+        invalidate_dashboard(user.id)
         auction = serializer.validated_data['auction']
 
         if auction.status != AuctionStatus.REGISTRATION:
@@ -290,8 +469,8 @@ class RegistrationFeeViewSet(viewsets.ModelViewSet):
         if registration_fee.registration_payment_status == PaymentStatus.PAID:
             return Response({"error": "Registration fee already paid."}, status=status.HTTP_400_BAD_REQUEST)
 
-        registration_fee.registration_payment_status = PaymentStatus.PAID
-        registration_fee.save()
+        versioned_update(registration_fee, registration_payment_status=PaymentStatus.PAID)
+        invalidate_dashboard(registration_fee.user_id)
 
         serializer = self.get_serializer(registration_fee)
 
@@ -345,6 +524,7 @@ class AssetDepositViewSet(viewsets.ModelViewSet):
         if not registration_fee or registration_fee.registration_payment_status != PaymentStatus.PAID:
             return Response({"error": "You must pay the registration fee before making a deposit."}, status=status.HTTP_400_BAD_REQUEST)
         serializer.save()
+        invalidate_dashboard(user.id)
 
         return Response({
             "message": "Deposit successful. Please proceed to pay the deposit.",
@@ -358,8 +538,11 @@ class AssetDepositViewSet(viewsets.ModelViewSet):
         if asset_deposit.deposit_payment_status == PaymentStatus.PAID:
             return Response({"error": "Deposit already paid."}, status=status.HTTP_400_BAD_REQUEST)
 
-        asset_deposit.deposit_payment_status = PaymentStatus.PAID
-        asset_deposit.save()
+        versioned_update(asset_deposit, deposit_payment_status=PaymentStatus.PAID)
+        invalidate_dashboard(asset_deposit.user_id)
+        # The index trusts positive entries, so only add committed payments.
+        transaction.on_commit(
+            lambda: add_eligible_bidders([(asset_deposit.auction_asset_id, asset_deposit.user_id)]))
 
         serializer = self.get_serializer(asset_deposit)
 
@@ -375,7 +558,7 @@ class ContractViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_staff:
             return Contract.objects.all()
-        return Contract.objects.filter(Q(sell=user)|Q(winner=user)) 
+        return Contract.objects.filter(Q(seller=user)|Q(winner=user)) 
     
     def get_permissions(self):
         if self.action in ['list','retrieve']:
@@ -401,6 +584,7 @@ class ContractViewSet(viewsets.ModelViewSet):
                 seller=seller,
                 status=ContractStatus.ACTIVE
             )
+        invalidate_dashboard(winner and winner.id, seller and seller.id)
 
         return Response({
             "message": "Contract created successful.",
@@ -410,9 +594,8 @@ class ContractViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsWinner], url_path='pay-winner')
     def pay_winner(self, request, pk=None):
         contract = self.get_object()
-        contract.winner_payment_status = PaymentStatus.PAID
-        contract.save()
-        contract.update_status()
+        contract.mark_paid('winner_payment_status')
+        invalidate_dashboard(contract.winner_id, contract.seller_id)
         return Response({
             "message": "Winner payment successful.",
             "contract": ContractSerializer(contract).data
@@ -422,15 +605,56 @@ class ContractViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsSeller], url_path='pay-seller')
     def pay_seller(self, request, pk=None):
         contract = self.get_object()
-        contract.seller_payment_status = PaymentStatus.PAID
-        contract.save()
-        contract.update_status()
+        contract.mark_paid('seller_payment_status')
+        invalidate_dashboard(contract.winner_id, contract.seller_id)
         return Response({
             "message": "Seller payment successful.",
             "contract": ContractSerializer(contract).data
         })
 
 
+@api_view(['POST'])
+@permission_classes([IsStaffUser])
+def reconcile_payments(request):
+    statement = request.FILES.get('file')
+    if statement is None:
+        return Response({"error": "A statement file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fmt = request.data.get('format') or detect_format(statement.name)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if fmt not in ['csv', 'jsonl']:
+        return Response({"error": "Format must be 'csv' or 'jsonl'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    report = reconcile_statement(statement.file, fmt)
+    return Response({"message": "Statement reconciled.", "report": report.as_dict()}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def dashboard(request):
+    return Response({"auctions": get_dashboard(request.user)}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def valuations(request):
+    """Comparable-sales statistics and a suggested price range for a batch of assets.
+
+    Staff may value any asset, appraisers the assets assigned to them.
+    """
+    serializer = ValuationRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    assets = Asset.objects.filter(pk__in=serializer.validated_data['assets']).only('id', 'category', 'origin', 'appraiser')
+    if not (request.user.is_staff or request.user.is_superuser):
+        appraiser = getattr(request.user, 'appraiser_profile', None)
+        if appraiser is None:
+            return Response({"error": "You must be an appraiser to request valuations."}, status=status.HTTP_403_FORBIDDEN)
+        assets = assets.filter(appraiser=appraiser)
+    return Response({"valuations": list(build_valuations(list(assets)).values())}, status=status.HTTP_200_OK)
+
+
 class TaxViewSet(viewsets.ModelViewSet):
     queryset = Tax.objects.all()
     serializer_class = TaxSerializer
@@ -449,4 +673,29 @@ class ContractTaxViewSet(viewsets.ModelViewSet):
 class ContractFeeViewSet(viewsets.ModelViewSet):
     queryset = ContractFee.objects.all()
     serializer_class = ContractFeeSerializer
-    permission_classes = [IsStaffUser]
\ No newline at end of file
+    permission_classes = [IsStaffUser]
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['kind', 'is_read']
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Notification.objects.none()
+        return Notification.objects.filter(user=self.request.user).order_by('-updated_at')
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        notification = self.get_object()
+        if not notification.is_read:
+            Notification.objects.filter(pk=notification.pk).update(is_read=True)
+            notification.is_read = True
+        return Response({"notification": self.get_serializer(notification).data}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='read-all')
+    def read_all(self, request):
+        updated = self.get_queryset().filter(is_read=False).update(is_read=True)
+        return Response({"message": f"{updated} notifications marked as read."}, status=status.HTTP_200_OK)
+
@@ -0,0 +1,42 @@
+import logging
+import time
+
+from assets.serializers import AssetReadOnlySerializer
+from .models import AuctionAsset
+from .serializers import AuctionSerializer, AuctionAssetSerializer
+from .eligibility import build_eligibility_index
+from .caching import store, auction_scope, auction_assets_scope, asset_scope
+from .page import store_auction_page
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up_auction(auction):
+    """Preload and pre-serialize what the bidding UI and the bid path read.
+
+    Returns a report including how long the warm-up took.
+    """
+    started = time.monotonic()
+
+    auction_assets = list(
+        AuctionAsset.objects.filter(auction=auction)
+        .select_related('asset')
+        .prefetch_related('asset__media__variants')
+        .order_by('start_at', 'pk')
+    )
+    store(auction_scope(auction.id), 'detail', AuctionSerializer(auction).data)
+    store_auction_page(auction, auction_assets)
+    store(auction_assets_scope(auction.id), 'list', AuctionAssetSerializer(auction_assets, many=True).data)
+    for auction_asset in auction_assets:
+        store(asset_scope(auction_asset.asset_id), 'read', AssetReadOnlySerializer(auction_asset.asset).data)
+
+    eligibility_entries = build_eligibility_index(auction)
+
+    report = {
+        'auction': auction.id,
+        'auction_assets': len(auction_assets),
+        'eligibility_entries': eligibility_entries,
+        'duration_ms': round((time.monotonic() - started) * 1000, 2),
+    }
+    logger.info("Warmed up auction %(auction)s in %(duration_ms)sms", report)
+    return report
@@ -0,0 +1,134 @@
+"""JWT authentication that trusts signed user claims instead of loading the user.
+
+Tokens carry the fields permission checks need (role, is_staff,
+is_superuser, is_active). A request is authenticated from those claims
+alone, with a deferred User instance whose other fields load on first
+access. When a user's role or activity changes, ``mark_auth_changed``
+records the time in the shared cache; tokens issued before it fall back to
+loading the user from the database until they are refreshed. ``User.save``
+and the user ``post_delete`` signal mark changes themselves; bulk updates of
+``role`` or ``is_active`` must go through ``update_auth_fields``. Users
+without a marker are remembered in a small in-process LRU for a few seconds,
+so the hot path touches neither the database nor the shared cache; markers
+themselves are always read from the shared cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+CLAIM_FIELDS = ('role', 'is_staff', 'is_superuser', 'is_active')
+
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def _changed_at_key(user_id):
+    return f"auth:user:{user_id}:changed_at"
+
+
+def mark_auth_changed(user_id):
+    """Stop trusting the claims of tokens issued to ``user_id`` until now."""
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.set(_changed_at_key(user_id), time.time(), int(lifetime))
+    with _recent_lock:
+        _recent.pop(user_id, None)
+
+
+def _auth_changed_at(user_id):
+    config = settings.AUTH_CLAIMS_CACHE
+    now = time.monotonic()
+    with _recent_lock:
+        expires_at = _recent.get(user_id)
+        if expires_at is not None and expires_at > now:
+            _recent.move_to_end(user_id)
+            return None
+
+    changed_at = cache.get(_changed_at_key(user_id))
+    if changed_at is not None:
+        # A marker can be moved forward by another process at any time, so
+        # only its absence is cached.
+        return changed_at
+    with _recent_lock:
+        _recent[user_id] = now + config['TTL']
+        _recent.move_to_end(user_id)
+        while len(_recent) > config['SIZE']:
+            _recent.popitem(last=False)
+    return None
+
+
+def update_auth_fields(queryset, **changes):
+    """Bulk-update ``role``/``is_active`` (or other claim fields) of ``queryset``.
+
+    ``QuerySet.update`` bypasses ``User.save``, so the updated users are
+    marked changed here. Returns the number of users updated.
+    """
+    with transaction.atomic():
+        user_ids = list(queryset.select_for_update().values_list('pk', flat=True))
+        updated = User.objects.filter(pk__in=user_ids).update(**changes)
+    for user_id in user_ids:
+        mark_auth_changed(user_id)
+    return updated
+
+
+def stamp_claims(token, user):
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    return token
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        return stamp_claims(super().for_user(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh that re-reads the user so new tokens carry current claims."""
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM]).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        stamp_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if any(field not in validated_token for field in CLAIM_FIELDS):
+            # Issued before claims were embedded.
+            return super().get_user(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        changed_at = _auth_changed_at(user_id)
+        if changed_at is not None and validated_token.get('iat', 0) < changed_at:
+            return super().get_user(validated_token)
+
+        if not validated_token['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        claims = {'id': user_id, **{field: validated_token[field] for field in CLAIM_FIELDS}}
+        # from_db expects values in the model's concrete field order.
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in claims]
+        return User.from_db(DEFAULT_DB_ALIAS, field_names, [claims[name] for name in field_names])
@@ -0,0 +1,5 @@
+OUTBOX_DEDUP_WINDOW = 60  # seconds; repeat sends of one kind to a user within it are merged
+OUTBOX_BATCH_SIZE = 50  # emails sent per SMTP connection
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_DELAY = 30  # seconds, doubled after each failed attempt
+OUTBOX_SENDING_LEASE = 5 * 60  # seconds before a claimed but unsent email is retried
@@ -8,4 +8,15 @@ class Gender(models.TextChoices):
 class UserRole(models.TextChoices):
     USER = 'user', 'User'
     ADMIN = 'admin', 'Admin'
-    STAFF = 'staff', 'Staff'
\ No newline at end of file
+    STAFF = 'staff', 'Staff'
+
+class EmailKind(models.TextChoices):
+    VERIFICATION = 'verification', 'Verification'
+    PASSWORD_RESET = 'password_reset', 'Password reset'
+    NOTIFICATION = 'notification', 'Notification'
+
+class EmailStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    SENDING = 'sending', 'Sending'
+    SENT = 'sent', 'Sent'
+    FAILED = 'failed', 'Failed'
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users import constants
+from users.tasks import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver due emails from the outbox in the current process."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=constants.OUTBOX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        sent = drain_outbox(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails"))
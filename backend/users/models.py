@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from .enums import Gender, UserRole
+from django.utils import timezone
+from .enums import EmailKind, EmailStatus, Gender, UserRole
 
 class CustomUserManager(BaseUserManager):
     """Custom user manager."""
@@ -56,9 +57,20 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_auth_state = instance._auth_state()
+        return instance
+
+    def _auth_state(self):
+        # Read from __dict__ so deferred fields are not loaded.
+        return (self.__dict__.get('role'), self.__dict__.get('is_active'))
+
     def save(self, *args, **kwargs):
         """Save user, setting permissions based on role."""
 
+        auth_changed = not self._state.adding and self._auth_state() != getattr(self, '_loaded_auth_state', None)
         if self.role == UserRole.ADMIN:
             self.is_superuser = True
             self.is_staff = True
@@ -70,5 +82,37 @@ class User(AbstractUser):
             self.is_staff = False
         super().save(*args, **kwargs)
 
+        if auth_changed:
+            from .authentication import mark_auth_changed
+            mark_auth_changed(self.pk)
+        self._loaded_auth_state = self._auth_state()
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name}"
+
+
+class OutboxEmail(models.Model):
+    """An email waiting to be (or already) delivered by the outbox worker."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='outbox_emails')
+    kind = models.CharField(max_length=20, choices=EmailKind.choices)
+    dedup_key = models.CharField(max_length=100, blank=True)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=EmailStatus.choices, default=EmailStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['recipient', 'kind', 'dedup_key', 'created_at']),
+        ]
+
     def __str__(self):
-        return f"{self.first_name} {self.last_name}"
\ No newline at end of file
+        return f"{self.kind} email to {self.recipient} ({self.status})"
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+from .enums import EmailStatus
+from .tasks import schedule_drain_outbox
+from users import constants
+
+
+def queue_email(kind, recipient, subject, body, user_id=None, dedup_key=''):
+    """Store an email in the outbox; a django-q worker delivers it.
+
+    Repeat emails of the same kind and ``dedup_key`` to the same recipient
+    within OUTBOX_DEDUP_WINDOW are merged: a still pending one takes the new
+    content (e.g. a fresh link), one already sent within the window is not
+    sent again.
+    """
+    window_start = timezone.now() - timedelta(seconds=constants.OUTBOX_DEDUP_WINDOW)
+    recent = OutboxEmail.objects.filter(
+        recipient=recipient, kind=kind, dedup_key=dedup_key, created_at__gte=window_start,
+        status__in=[EmailStatus.PENDING, EmailStatus.SENDING, EmailStatus.SENT],
+    ).order_by('-created_at').first()
+
+    if recent is not None:
+        if recent.status != EmailStatus.PENDING:
+            return recent
+        if OutboxEmail.objects.filter(pk=recent.pk, status=EmailStatus.PENDING).update(
+                subject=subject, body=body, updated_at=timezone.now()):
+            return recent
+
+    email = OutboxEmail.objects.create(
+        user_id=user_id, kind=kind, dedup_key=dedup_key, recipient=recipient, subject=subject, body=body)
+    transaction.on_commit(schedule_drain_outbox)
+    return email
+
+
+def queue_emails(emails):
+    """Store many unsaved OutboxEmail rows at once, without deduplication."""
+    OutboxEmail.objects.bulk_create(emails)
+    if emails:
+        transaction.on_commit(schedule_drain_outbox)
+    return emails
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .authentication import mark_auth_changed
+from .models import User
+
+
+@receiver(post_delete, sender=User)
+def revoke_claims(sender, instance, **kwargs):
+    """Tokens of a deleted user must not keep authenticating from their claims."""
+    mark_auth_changed(instance.pk)
@@ -0,0 +1,115 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from american_auction.scheduling import run_at
+from .models import OutboxEmail
+from .enums import EmailStatus
+from users import constants
+
+logger = logging.getLogger(__name__)
+
+
+def _claim_batch(batch_size):
+    """Mark up to ``batch_size`` due emails as SENDING and return them.
+
+    Rows locked by another worker are skipped, so several drains can run at
+    once without sending an email twice.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=constants.OUTBOX_SENDING_LEASE)
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=EmailStatus.PENDING, next_attempt_at__lte=now)
+                | Q(status=EmailStatus.SENDING, updated_at__lt=lease_expired)
+            )
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            status=EmailStatus.SENDING, updated_at=now)
+    return batch
+
+
+def _failed(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= constants.OUTBOX_MAX_ATTEMPTS:
+        email.status = EmailStatus.FAILED
+    else:
+        email.status = EmailStatus.PENDING
+        email.next_attempt_at = now + timedelta(
+            seconds=constants.OUTBOX_RETRY_BASE_DELAY * 2 ** (email.attempts - 1))
+
+
+def _send_batch(batch):
+    """Send a batch over one SMTP connection and record each result."""
+    now = timezone.now()
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("Could not open the mail connection: %s", e)
+        for email in batch:
+            _failed(email, e, now)
+    else:
+        try:
+            for email in batch:
+                try:
+                    EmailMessage(
+                        email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.recipient],
+                        connection=connection,
+                    ).send()
+                except Exception as e:
+                    _failed(email, e, now)
+                else:
+                    email.status = EmailStatus.SENT
+                    email.attempts += 1
+                    email.sent_at = now
+        finally:
+            connection.close()
+
+    for email in batch:
+        email.updated_at = now
+    OutboxEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'updated_at'])
+
+
+def drain_outbox(batch_size=constants.OUTBOX_BATCH_SIZE):
+    """Deliver every due email, one SMTP connection per batch.
+
+    Schedules another drain for the earliest retry that is not yet due.
+    Returns the number of emails sent.
+    """
+    sent = 0
+    while True:
+        batch = _claim_batch(batch_size)
+        if not batch:
+            break
+        _send_batch(batch)
+        sent += sum(1 for email in batch if email.status == EmailStatus.SENT)
+
+    next_attempt_at = OutboxEmail.objects.filter(status=EmailStatus.PENDING).aggregate(
+        next_attempt_at=Min('next_attempt_at'))['next_attempt_at']
+    if next_attempt_at is not None:
+        schedule_drain_outbox(next_attempt_at)
+    return sent
+
+
+def schedule_drain_outbox(at=None):
+    """Drain the outbox now, or at ``at`` for the earliest pending retry.
+
+    There is one pending retry drain at a time; drain_outbox always asks for
+    the earliest retry, so replacing the previous one loses nothing.
+    """
+    if at is None:
+        async_task('users.tasks.drain_outbox')
+    else:
+        run_at('users.tasks.drain_outbox', at=at, name='drain_outbox:retry')
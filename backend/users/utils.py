@@ -1,9 +1,9 @@
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.core.mail import send_mail
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.urls import reverse
-from django.conf import settings
+from .enums import EmailKind
+from .outbox import queue_email
 
 class AccountActivationTokenGenerator(PasswordResetTokenGenerator):
     def __init__(self, timeout=300):
@@ -63,4 +63,4 @@ def send_verification_email(user, request):
 
     subject = '[American Auction] Verify Account'
     message = f'Hi, {user.email} \nClick the link below to verify your email address:\n\n{verification_link}\nThis link will expire in 5 minutes'
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
\ No newline at end of file
+    queue_email(EmailKind.VERIFICATION, user.email, subject, message, user_id=user.id)
\ No newline at end of file
@@ -5,8 +5,6 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 
-from django.core.mail import send_mail
-from django.conf import settings
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
 from django.urls import reverse
@@ -17,6 +15,9 @@ from .serializers import (LoginSerializer, UserSerializer, SignUpSerializer, Cha
 from .permissions import IsAdminUser, IsStaffUser
 from .models import User
 from .utils import send_verification_email, account_activation_token, password_reset_token
+from .authentication import ClaimsRefreshToken
+from .enums import EmailKind
+from .outbox import queue_email
 
     
 @api_view(['POST'])
@@ -103,7 +104,7 @@ def request_reset_password(request):
 
     subject = '[American Auction] Reset your password'
     message = f'Hi, {user.email} \nClick the link below to reset your password:\n\n{reset_link}\nThis link will expire in 5 minutes.'
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
+    queue_email(EmailKind.PASSWORD_RESET, user.email, subject, message, user_id=user.id)
 
     return Response({"message": "A password reset link has been sent to your email."}, status=status.HTTP_200_OK)
 
@@ -152,7 +153,7 @@ def login(request):
         user.last_login = timezone.now()
         user.save(update_fields=['last_login'])
 
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         return Response({
             'message': 'Login successful',
             'user': UserSerializer(user).data,
@@ -195,7 +196,8 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
         return UserSerializer
 
     def get_object(self):
-        return self.request.user
+        # request.user is built from token claims with most fields deferred.
+        return User.objects.get(pk=self.request.user.pk)
     
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()